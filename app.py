@@ -3,15 +3,36 @@ import sys
 import asyncio
 import logging
 from pathlib import Path
+from typing import (
+    AsyncIterator,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    TextIO,
+    Tuple,
+)
 from flask import Flask, request, jsonify
 
 from file_manager import FileManager
 from config import load_env
-from excel_utils import load_companies_from_file
+from excel_utils import (
+    iter_companies_from_file,
+    SUPPORTED_EXTENSIONS,
+)
+from json_poster import enqueue_json_result, get_delivery_queue, FLUSH_TIMEOUT
 from company_domain_categorizer import DomainCategorizer
+from batch_processor import BatchProcessor, log_progress
 
 logger = logging.getLogger(__name__)
 
+# Companies looked up in the result store per query.
+STORE_LOOKUP_BLOCK = 500
+
+# Company names, and whether the result store already holds all of them.
+Chunk = Tuple[List[str], bool]
+
 
 class CompanyCategorizerApp:
     def __init__(self):
@@ -38,6 +59,15 @@ class CompanyCategorizerApp:
             logger.info(f"Creating new categories file at {categories_file}")
 
         self.categorizer = DomainCategorizer(categories_file=str(categories_file))
+        # Time budget per chunk, retries included; see _categorize_many.
+        self.item_timeout = (
+            self.categorizer.config.get("batch_item_timeout", 60.0) or None
+        )
+        self.batch_processor = BatchProcessor(
+            max_concurrency=self.categorizer.config.get("batch_concurrency", 8),
+            item_timeout=None,
+            on_progress=log_progress,
+        )
 
     async def handle_input(self, clean_output: bool = False):
         """Handle interactive input with improved error handling"""
@@ -67,29 +97,221 @@ class CompanyCategorizerApp:
             logger.info("Application terminated by user")
             raise
 
+    @staticmethod
+    def _blocks(companies: Iterable[str], size: int) -> Iterator[List[str]]:
+        """Unique company names in blocks of ``size``, lazily."""
+        seen = set()
+        block: List[str] = []
+        for company in companies:
+            if company in seen:
+                continue
+            seen.add(company)
+            block.append(company)
+            if len(block) >= size:
+                yield block
+                block = []
+        if block:
+            yield block
+
+    def _company_chunks(
+        self, companies: Iterable[str], clean_output: bool = False
+    ) -> Iterator[Chunk]:
+        """Group unique company names into chunks, lazily.
+
+        Companies with an up-to-date stored result come out in chunks of
+        their own; the rest are packed into AI batch-sized chunks, so an
+        incremental run only computes new or invalidated rows.
+        """
+        batch_size = max(1, self.categorizer.config.get("ai_batch_size", 1))
+        total = reused = 0
+        pending: List[str] = []
+        for block in self._blocks(companies, STORE_LOOKUP_BLOCK):
+            stored = set(self.categorizer.has_stored_results(block, clean_output))
+            total += len(block)
+            reused += len(stored)
+            if stored:
+                yield [company for company in block if company in stored], True
+            for company in block:
+                if company in stored:
+                    continue
+                pending.append(company)
+                if len(pending) >= batch_size:
+                    yield pending, False
+                    pending = []
+        if pending:
+            yield pending, False
+        if reused:
+            logger.info(f"Reused {reused} of {total} stored results")
+
+    async def _categorize_one(
+        self, company: str, clean_output: bool, timeout: Optional[float]
+    ) -> Dict:
+        try:
+            results = await asyncio.wait_for(
+                self.categorizer.categorize_companies(
+                    [company], clean_output=clean_output
+                ),
+                timeout,
+            )
+            return results[0]
+        except asyncio.TimeoutError:
+            logger.error(f"{company!r} timed out after {timeout:.1f}s")
+            return {"error": f"Timed out after {timeout:.1f}s"}
+        except Exception as e:
+            logger.error(f"{company!r} failed: {e}")
+            return {"error": str(e)}
+
+    async def _categorize_many(
+        self, companies: List[str], clean_output: bool
+    ) -> List[Dict]:
+        """Categorize a chunk in one batched call, retrying each company on
+        its own when the batched call is too slow.
+
+        The batched call and the retries share one item_timeout budget: the
+        batched call gets half of it and the retries whatever is left, so a
+        chunk never takes longer than item_timeout.
+        """
+        budget = self.item_timeout
+        if len(companies) == 1:
+            return [await self._categorize_one(companies[0], clean_output, budget)]
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        try:
+            return await asyncio.wait_for(
+                self.categorizer.categorize_companies(
+                    companies, clean_output=clean_output
+                ),
+                budget / 2 if budget else None,
+            )
+        except asyncio.TimeoutError:
+            logger.warning(
+                f"Chunk of {len(companies)} timed out after {budget / 2:.1f}s;"
+                " retrying companies one by one"
+            )
+        remaining = max(budget - (loop.time() - started), 0.0)
+        return await asyncio.gather(
+            *(
+                self._categorize_one(company, clean_output, remaining)
+                for company in companies
+            )
+        )
+
+    def _categorize_chunk(self, clean_output: bool):
+        async def categorize(chunk: Chunk) -> List[Dict]:
+            companies, from_store = chunk
+            # A SQLite read, so it runs in a thread.
+            results = (
+                await asyncio.to_thread(
+                    self.categorizer.stored_results, companies, clean_output
+                )
+                if from_store
+                else {}
+            )
+            # Anything invalidated since the chunk was planned is recomputed.
+            missing = [company for company in companies if company not in results]
+            if missing:
+                computed = await self._categorize_many(missing, clean_output)
+                results.update(zip(missing, computed))
+            return [results[company] for company in companies]
+
+        return categorize
+
+    @staticmethod
+    def _split_chunk_output(chunk: List[str], chunk_output) -> Iterator[Tuple]:
+        if isinstance(chunk_output, list):
+            yield from zip(chunk, chunk_output)
+        else:
+            # The whole chunk failed or timed out.
+            for company in chunk:
+                yield company, chunk_output
+
+    async def iter_file_results(
+        self, file_path: str, clean_output: bool = False
+    ) -> AsyncIterator[Tuple[str, Dict]]:
+        """Yield ``(company, result)`` pairs as soon as each chunk finishes.
+
+        Stored results come through without recomputation. Each row is also
+        queued for posting when POST_URL is set.
+        """
+        chunks = self._company_chunks(iter_companies_from_file(file_path), clean_output)
+        async for _, (companies, _), chunk_output in self.batch_processor.stream(
+            chunks, self._categorize_chunk(clean_output)
+        ):
+            for company, result in self._split_chunk_output(companies, chunk_output):
+                enqueue_json_result({"company": company, "result": result})
+                yield company, result
+
     async def handle_file_input(self, file_path: str, clean_output: bool = False):
         try:
-            companies = load_companies_from_file(file_path)
+            # File parsing and store lookups block; keep them off the loop.
+            companies = await asyncio.to_thread(
+                lambda: list(dict.fromkeys(iter_companies_from_file(file_path)))
+            )
+            chunks = await asyncio.to_thread(
+                lambda: list(self._company_chunks(companies, clean_output))
+            )
+            outputs = await self.batch_processor.run(
+                chunks, self._categorize_chunk(clean_output)
+            )
             results = {}
-            for company in companies:
-                results[company] = await self.categorizer.categorize_company(
-                    company, clean_output=clean_output
-                )
-            # Return results instead of printing
-            return results
+            for (chunk, _), chunk_output in zip(chunks, outputs):
+                results.update(self._split_chunk_output(chunk, chunk_output))
+            # Return results in file order instead of printing
+            return {company: results[company] for company in companies}
         except Exception as e:
             return {"error": f"Error processing file: {e}"}
 
-    async def run(self, file_path: str = None, clean_output: bool = False):
-        if file_path:
-            results = await self.handle_file_input(file_path, clean_output=clean_output)
-            # New: post results if POST_URL is set, using json_poster
-            from json_poster import post_json_result
+    async def stream_file_input(
+        self, file_path: str, out: TextIO, clean_output: bool = False
+    ) -> int:
+        """Write one NDJSON line per company to ``out`` as results arrive.
+
+        Memory stays flat regardless of input size. Returns the number of
+        companies written.
+        """
+        count = 0
+        try:
+            async for company, result in self.iter_file_results(
+                file_path, clean_output=clean_output
+            ):
+                out.write(ndjson_line(company, result))
+                out.flush()
+                count += 1
+        except Exception as e:
+            out.write(json.dumps({"error": f"Error processing file: {e}"}) + "\n")
+            out.flush()
+        return count
 
-            await asyncio.to_thread(post_json_result, results)
+    async def run(
+        self,
+        file_path: str = None,
+        clean_output: bool = False,
+        ndjson: bool = False,
+        output_path: str = None,
+    ):
+        if file_path and (ndjson or output_path):
+            if output_path:
+                with open(output_path, "w", encoding="utf-8") as out:
+                    count = await self.stream_file_input(file_path, out, clean_output)
+                logger.info(f"Wrote {count} results to {output_path}")
+            else:
+                await self.stream_file_input(file_path, sys.stdout, clean_output)
+        elif file_path:
+            results = await self.handle_file_input(file_path, clean_output=clean_output)
+            # Post results if POST_URL is set, through the delivery queue.
+            enqueue_json_result(results)
             print(json.dumps(results, indent=2))
         else:
             await self.handle_input(clean_output=clean_output)
+        delivery = get_delivery_queue()
+        if delivery is not None and not await asyncio.to_thread(
+            delivery.flush, FLUSH_TIMEOUT
+        ):
+            logger.warning("Results still queued for delivery; see the journal")
+
+
+def ndjson_line(company: str, result: Dict) -> str:
+    return json.dumps({"company": company, "result": result}, default=str) + "\n"
 
 
 # Added CLI entry point (removed server-related code)
@@ -99,12 +321,21 @@ async def main_cli():
     file_arg = (
         sys.argv[1]
         if len(sys.argv) > 1
-        and sys.argv[1].lower().endswith((".xlsx", ".xls", ".csv", ".json"))
+        and sys.argv[1].lower().endswith(SUPPORTED_EXTENSIONS)
         else None
     )
     # Check for a "--clean" flag
     clean_flag = "--clean" in sys.argv
-    await CompanyCategorizerApp().run(file_arg, clean_output=clean_flag)
+    # "--ndjson" streams one JSON line per company; "--output=PATH" writes
+    # that stream to a file instead of stdout.
+    ndjson_flag = "--ndjson" in sys.argv
+    output_path = next(
+        (arg.split("=", 1)[1] for arg in sys.argv if arg.startswith("--output=")),
+        None,
+    )
+    await CompanyCategorizerApp().run(
+        file_arg, clean_output=clean_flag, ndjson=ndjson_flag, output_path=output_path
+    )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,378 @@
+"""ASGI serving mode exposing the same routes as flask_server.
+
+Handlers await the categorizer and analysis coroutines on the server's own
+event loop, so a slow Gemini or Wikidata call holds a coroutine rather than
+a worker thread. Blocking work (SQLite caches, file scans, index loads) runs
+in threads, and the indexes are loaded at startup. Run with::
+
+    uvicorn asgi_server:app --host 0.0.0.0 --port 5000
+"""
+
+import asyncio
+import contextlib
+import json
+import logging
+import os
+from typing import Any, Dict, Optional
+
+from dotenv import load_dotenv
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+from app import CompanyCategorizerApp, ndjson_line
+from company_analysis import analyze_company, DEFAULT_DEADLINE
+from config import get_request_deadline
+from json_poster import delivery_stats, enqueue_json_result
+from peer_analytics import peer_comparison
+from rate_limiter import limiter_stats
+from services import get_company_financials, get_bulk_financials, MAX_BULK_TICKERS
+from services import cache as services_cache
+from streaming import (
+    STREAM_IDLE_TIMEOUT,
+    stream_categorization,
+    format_ndjson,
+    format_sse,
+)
+from wikidata import cache_stats as wikidata_cache_stats
+
+logger = logging.getLogger(__name__)
+
+instance = CompanyCategorizerApp()
+
+
+def _flag(value: Any) -> bool:
+    if isinstance(value, bool):
+        return value
+    return str(value or "false").lower() == "true"
+
+
+async def _json_body(request: Request) -> Optional[Dict]:
+    try:
+        data = await request.json()
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def _error(message: str, status_code: int = 500) -> JSONResponse:
+    return JSONResponse({"error": message}, status_code=status_code)
+
+
+async def _categorize(company_name: str, clean: bool, deadline: float) -> Dict:
+    return await asyncio.wait_for(
+        instance.categorizer.categorize_company(company_name, clean_output=clean),
+        timeout=deadline,
+    )
+
+
+async def health_check(request: Request) -> JSONResponse:
+    return JSONResponse({"status": "ok"})
+
+
+async def cache_stats_endpoint(request: Request) -> JSONResponse:
+    return JSONResponse(
+        dict(
+            instance.categorizer.cache_stats(),
+            wikidata=wikidata_cache_stats(),
+            services=services_cache.stats(),
+        )
+    )
+
+
+async def rate_limits_endpoint(request: Request) -> JSONResponse:
+    return JSONResponse(limiter_stats())
+
+
+async def delivery_stats_endpoint(request: Request) -> JSONResponse:
+    return JSONResponse(delivery_stats())
+
+
+async def context_endpoint(request: Request) -> Response:
+    version, context = instance.categorizer.context_cache.get_versioned()
+    etag = f'"{version}"'
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers={"ETag": etag})
+    return JSONResponse(
+        {"version": version, "context": context}, headers={"ETag": etag}
+    )
+
+
+async def categorize_endpoint(request: Request) -> JSONResponse:
+    company_name = request.query_params.get("query")
+    if not company_name:
+        return _error("Missing company_name parameter", 400)
+    deadline = get_request_deadline(request.query_params.get("deadline"))
+    try:
+        result = await _categorize(
+            company_name, _flag(request.query_params.get("clean")), deadline
+        )
+        raw_data = result.get("raw_market_data", {})
+        post_response = enqueue_json_result(raw_data)
+        return JSONResponse({"result": result, "post_response": post_response})
+    except asyncio.TimeoutError:
+        return _error(f"Timed out after {deadline}s", 504)
+    except Exception as e:
+        logger.error(f"/categorize error: {e}")
+        return _error(str(e))
+
+
+async def categorize_file_endpoint(request: Request) -> Response:
+    file_path = request.query_params.get("file_path")
+    if not file_path:
+        return _error("Missing file_path parameter", 400)
+    clean_param = _flag(request.query_params.get("clean"))
+    if _flag(request.query_params.get("stream")):
+
+        async def generate():
+            results = instance.iter_file_results(file_path, clean_output=clean_param)
+            try:
+                while True:
+                    try:
+                        company, result = await asyncio.wait_for(
+                            results.__anext__(), STREAM_IDLE_TIMEOUT
+                        )
+                    except StopAsyncIteration:
+                        break
+                    yield ndjson_line(company, result)
+            except asyncio.TimeoutError:
+                message = f"No progress for {STREAM_IDLE_TIMEOUT}s"
+                yield json.dumps({"error": f"Error processing file: {message}"}) + "\n"
+            finally:
+                await results.aclose()
+
+        return StreamingResponse(generate(), media_type="application/x-ndjson")
+    deadline = get_request_deadline(request.query_params.get("deadline"))
+    try:
+        result = await asyncio.wait_for(
+            instance.handle_file_input(file_path, clean_output=clean_param),
+            timeout=deadline,
+        )
+        raw_data = result.get("raw_market_data", {}) if isinstance(result, dict) else {}
+        post_response = enqueue_json_result(raw_data)
+        return JSONResponse({"result": result, "post_response": post_response})
+    except asyncio.TimeoutError:
+        return _error(f"Timed out after {deadline}s", 504)
+    except Exception as e:
+        logger.error(f"/categorize_file error: {e}")
+        return _error(str(e))
+
+
+async def post_json_endpoint(request: Request) -> JSONResponse:
+    data = await _json_body(request)
+    if not data:
+        return _error("No JSON payload provided", 400)
+    post_response = enqueue_json_result(data)
+    if post_response is None:
+        return _error("Failed to post JSON result")
+    return JSONResponse({"post_response": post_response})
+
+
+async def stream_categorize_endpoint(request: Request) -> Response:
+    params = request.query_params
+    company_name = params.get("company_name")
+    if not company_name:
+        return _error("Missing company_name parameter", 400)
+    use_sse = params.get("format") == "sse" or (
+        "text/event-stream" in request.headers.get("accept", "")
+    )
+    formatter = format_sse if use_sse else format_ndjson
+    deadline = get_request_deadline(params.get("deadline"), DEFAULT_DEADLINE)
+
+    async def generate():
+        events = stream_categorization(
+            instance.categorizer,
+            company_name,
+            enrich=_flag(params.get("enrich", "true")),
+            deadline=deadline,
+        )
+        async for event in events:
+            yield formatter(event)
+
+    return StreamingResponse(
+        generate(),
+        media_type="text/event-stream" if use_sse else "application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def json_response(request: Request) -> JSONResponse:
+    company_name = None
+    if request.method == "POST":
+        data = await _json_body(request)
+        if data and "company" in data:
+            company_name = data["company"]
+    else:
+        company_name = request.query_params.get("company")
+    if not company_name:
+        return JSONResponse(
+            {"message": "Provide a company parameter, e.g., /json?company=YourCompany"}
+        )
+    return JSONResponse(
+        {
+            "company": company_name,
+            "analysis": {"step1": "processing...", "step2": "processing..."},
+            "final_result": "Category X",
+        }
+    )
+
+
+async def company_post(request: Request) -> JSONResponse:
+    company_name = request.path_params["company_name"]
+    deadline = get_request_deadline(request.query_params.get("deadline"))
+    try:
+        result = await _categorize(
+            company_name, _flag(request.query_params.get("clean")), deadline
+        )
+        return JSONResponse({"result": result})
+    except asyncio.TimeoutError:
+        return _error(f"Timed out after {deadline}s", 504)
+    except Exception as e:
+        logger.error(f"/company/{company_name} error: {e}")
+        return _error(str(e))
+
+
+async def company_json_post(request: Request) -> JSONResponse:
+    data = await _json_body(request)
+    if not data or "query" not in data:
+        return _error("Missing 'company' in JSON payload", 400)
+    deadline = get_request_deadline(data.get("deadline"))
+    try:
+        result = await _categorize(data["query"], _flag(data.get("clean")), deadline)
+        return JSONResponse({"result": result})
+    except asyncio.TimeoutError:
+        return _error(f"Timed out after {deadline}s", 504)
+    except Exception as e:
+        logger.error(f"/company_json error: {e}")
+        return _error(str(e))
+
+
+async def yfinance_data(request: Request) -> JSONResponse:
+    try:
+        data = await _json_body(request)
+        if not data or "ticker" not in data:
+            return _error("Missing ticker in request body", 400)
+
+        ticker = data["ticker"].strip()
+        financial_data = await run_in_threadpool(
+            get_company_financials, ticker, sections=data.get("sections")
+        )
+        if not financial_data:
+            return _error("Could not fetch financial data")
+        return JSONResponse({"ticker": ticker, "financial_data": financial_data})
+    except ValueError as e:
+        return _error(str(e), 400)
+    except Exception as e:
+        logger.exception("Unhandled exception in /api/yfinance")
+        return _error(f"An error occurred: {str(e)}")
+
+
+async def yfinance_bulk_data(request: Request) -> JSONResponse:
+    try:
+        data = await _json_body(request)
+        tickers = data.get("tickers") if data else None
+        if not isinstance(tickers, list) or not tickers:
+            return _error("Missing tickers list in request body", 400)
+        if len(tickers) > MAX_BULK_TICKERS:
+            return _error(f"At most {MAX_BULK_TICKERS} tickers per request", 400)
+
+        return JSONResponse(
+            await run_in_threadpool(
+                get_bulk_financials, tickers, sections=data.get("sections")
+            )
+        )
+    except ValueError as e:
+        return _error(str(e), 400)
+    except Exception as e:
+        logger.exception("Unhandled exception in /api/yfinance/bulk")
+        return _error(f"An error occurred: {str(e)}")
+
+
+async def peer_comparison_data(request: Request) -> JSONResponse:
+    try:
+        data = await _json_body(request)
+        if not data or "ticker" not in data:
+            return _error("Missing ticker in request body", 400)
+        peers = data.get("peers") or []
+        if len(peers) + 1 > MAX_BULK_TICKERS:
+            return _error(f"At most {MAX_BULK_TICKERS} tickers per request", 400)
+
+        return JSONResponse(
+            await run_in_threadpool(peer_comparison, data["ticker"], peers)
+        )
+    except ValueError as e:
+        return _error(str(e), 400)
+    except Exception as e:
+        logger.exception("Unhandled exception in /api/peer_comparison")
+        return _error(f"An error occurred: {str(e)}")
+
+
+async def company_analysis(request: Request) -> JSONResponse:
+    try:
+        data = await _json_body(request)
+        if not data or "company_name" not in data:
+            return _error("Missing company_name in request body", 400)
+
+        response_data = await analyze_company(
+            data["company_name"].strip(),
+            deadline=get_request_deadline(data.get("deadline"), DEFAULT_DEADLINE),
+            use_reference=_flag(data.get("use_reference", True)),
+        )
+        return JSONResponse(response_data)
+    except Exception as e:
+        logger.exception("Unhandled exception in /api/company_analysis")
+        return _error(f"An error occurred: {str(e)}")
+
+
+routes = [
+    Route("/health", health_check, methods=["GET"]),
+    Route("/cache_stats", cache_stats_endpoint, methods=["GET"]),
+    Route("/rate_limits", rate_limits_endpoint, methods=["GET"]),
+    Route("/delivery_stats", delivery_stats_endpoint, methods=["GET"]),
+    Route("/context", context_endpoint, methods=["GET"]),
+    Route("/categorize", categorize_endpoint, methods=["POST"]),
+    Route("/categorize_file", categorize_file_endpoint, methods=["GET"]),
+    Route("/post_json", post_json_endpoint, methods=["POST"]),
+    Route("/stream_categorize", stream_categorize_endpoint, methods=["GET"]),
+    Route("/json", json_response, methods=["GET", "POST"]),
+    Route("/company/{company_name}", company_post, methods=["POST"]),
+    Route("/company_json", company_json_post, methods=["POST"]),
+    Route("/api/yfinance", yfinance_data, methods=["POST"]),
+    Route("/api/yfinance/bulk", yfinance_bulk_data, methods=["POST"]),
+    Route("/api/peer_comparison", peer_comparison_data, methods=["POST"]),
+    Route("/api/company_analysis", company_analysis, methods=["POST"]),
+]
+
+@contextlib.asynccontextmanager
+async def lifespan(app: Starlette):
+    # Load the context, reference index and name index before serving, so
+    # the first requests do not build them on the event loop.
+    try:
+        await run_in_threadpool(instance.categorizer.warm_up)
+    except Exception as e:
+        logger.warning(f"Warm-up failed; loading on first use instead: {e}")
+    yield
+
+
+app = Starlette(
+    routes=routes,
+    lifespan=lifespan,
+    middleware=[Middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"])],
+)
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    load_dotenv()
+    uvicorn.run(
+        "asgi_server:app",
+        host="0.0.0.0",
+        port=int(os.getenv("PORT", 5000)),
+        workers=int(os.getenv("ASGI_WORKERS", "1")),
+    )
@@ -0,0 +1,128 @@
+import asyncio
+import logging
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+logger = logging.getLogger(__name__)
+
+ProgressCallback = Callable[[int, Optional[int], Any], None]
+
+
+class BatchProcessor:
+    """Runs an async worker over many items with bounded concurrency.
+
+    Results come back in input order. A failing or timed-out item yields an
+    ``{"error": ...}`` dict in its slot instead of aborting the whole batch.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 8,
+        item_timeout: Optional[float] = 60.0,
+        on_progress: Optional[ProgressCallback] = None,
+    ):
+        """
+        Args:
+            max_concurrency: Maximum number of items in flight at once.
+            item_timeout: Seconds allowed per item; None disables the timeout.
+            on_progress: Called as ``on_progress(done, total, item)`` after
+                each item finishes.
+        """
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.item_timeout = item_timeout
+        self.on_progress = on_progress
+
+    async def _run_one(
+        self,
+        semaphore: asyncio.Semaphore,
+        worker: Callable[[Any], Awaitable[Any]],
+        item: Any,
+    ) -> Any:
+        async with semaphore:
+            try:
+                if self.item_timeout:
+                    return await asyncio.wait_for(worker(item), self.item_timeout)
+                return await worker(item)
+            except asyncio.TimeoutError:
+                logger.error(f"Batch item {item!r} timed out after {self.item_timeout}s")
+                return {"error": f"Timed out after {self.item_timeout}s"}
+            except Exception as e:
+                logger.error(f"Batch item {item!r} failed: {e}")
+                return {"error": str(e)}
+
+    async def stream(
+        self, items: Iterable[Any], worker: Callable[[Any], Awaitable[Any]]
+    ) -> AsyncIterator[Tuple[int, Any, Any]]:
+        """Yield ``(index, item, result)`` as each item finishes.
+
+        Items are pulled lazily by ``max_concurrency`` workers, so at most that
+        many items (plus a small output buffer) are held at any time and
+        ``items`` may be an unbounded generator.
+        """
+        total = len(items) if hasattr(items, "__len__") else None
+        source = enumerate(items)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.max_concurrency * 2)
+        finished = object()
+        source_error: List[BaseException] = []
+        source_lock = asyncio.Lock()
+
+        async def pump() -> None:
+            try:
+                while True:
+                    # Sources may read files or databases; pull them in a
+                    # worker thread so the event loop keeps serving.
+                    async with source_lock:
+                        entry = await asyncio.to_thread(next, source, finished)
+                    if entry is finished:
+                        break
+                    index, item = entry
+                    result = await self._run_one(semaphore, worker, item)
+                    await queue.put((index, item, result))
+            except Exception as e:
+                source_error.append(e)
+            finally:
+                await queue.put(finished)
+
+        workers = [
+            asyncio.ensure_future(pump()) for _ in range(self.max_concurrency)
+        ]
+        remaining = len(workers)
+        done = 0
+        try:
+            while remaining:
+                entry = await queue.get()
+                if entry is finished:
+                    remaining -= 1
+                    continue
+                done += 1
+                if self.on_progress:
+                    self.on_progress(done, total, entry[1])
+                yield entry
+        finally:
+            for task in workers:
+                task.cancel()
+        if source_error:
+            raise source_error[0]
+
+    async def run(
+        self, items: Sequence[Any], worker: Callable[[Any], Awaitable[Any]]
+    ) -> List[Any]:
+        """Apply ``worker`` to every item and return results in input order."""
+        results: List[Any] = [None] * len(items)
+        async for index, _, result in self.stream(items, worker):
+            results[index] = result
+        return results
+
+
+def log_progress(done: int, total: Optional[int], item: Any) -> None:
+    logger.info(f"Processed {done}/{total if total is not None else '?'}: {item}")
@@ -0,0 +1,83 @@
+from collections import deque
+from typing import Dict, List, Iterable, Tuple
+
+
+class CategoryMatcher:
+    """Aho-Corasick automaton over the rule-based category patterns.
+
+    Built once from the ``byType`` section of categories.json; matching a
+    company name is then a single pass over the name regardless of how many
+    categories or patterns are loaded.
+    """
+
+    def __init__(self, entries: Iterable[Tuple[str, List[str], List[str]]]):
+        """
+        Args:
+            entries: ``(category, patterns, subcategories)`` tuples. Patterns
+                must already be lower-cased.
+        """
+        self.categories: List[str] = []
+        self.subcategories: List[List[str]] = []
+        # Categories with an empty pattern match every name.
+        self._always: List[int] = []
+
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]
+
+        for index, (category, patterns, subcats) in enumerate(entries):
+            self.categories.append(category)
+            self.subcategories.append(subcats)
+            for pattern in set(patterns):
+                if not pattern:
+                    self._always.append(index)
+                else:
+                    self._add_pattern(pattern, index)
+        self._build_failure_links()
+
+    def _add_pattern(self, pattern: str, index: int) -> None:
+        node = 0
+        for char in pattern:
+            nxt = self._goto[node].get(char)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][char] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        if index not in self._out[node]:
+            self._out[node].append(index)
+
+    def _build_failure_links(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[child] = target if target != child else 0
+                # Merge outputs along the failure chain so search never walks it.
+                for index in self._out[self._fail[child]]:
+                    if index not in self._out[child]:
+                        self._out[child].append(index)
+
+    def match(self, text: str) -> List[int]:
+        """Return indices of categories with a pattern occurring in ``text``,
+        in the order the categories were added."""
+        found = set(self._always)
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        for char in text:
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if out[node]:
+                found.update(out[node])
+        return sorted(found)
+
+    def __len__(self) -> int:
+        return len(self.categories)
@@ -0,0 +1,205 @@
+import asyncio
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+from reference_index import lookup_company, suggest_company
+from name_resolution import name_key
+from services import get_ticker_from_name, get_company_financials, get_competitors
+from ttl_cache import AsyncSingleflight
+from wikidata import get_wikidata_id, get_entity_profile
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DEADLINE = float(os.getenv("ANALYSIS_DEADLINE", "15"))
+
+# Dedicated pool so a timed-out upstream call never delays event loop shutdown.
+_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("ANALYSIS_WORKERS", "16")),
+    thread_name_prefix="company-analysis",
+)
+
+# Concurrent analyses of the same company share one run.
+_analysis_flight = AsyncSingleflight()
+
+# Sources served from the single combined Wikidata profile query.
+PROFILE_FIELDS = {"wikidata_details": "details", "funding_rounds": "funding_rounds"}
+
+# Response keys in payload order, mapped to the branch that produces them.
+SOURCES = {
+    "wikidata_id": "wikidata",
+    "wikidata_details": "wikidata",
+    "funding_rounds": "wikidata",
+    "ticker": "yahoo",
+    "financial_data": "yahoo",
+    "competitors": "competitors",
+}
+
+
+def _source_status(task: Optional[asyncio.Future], timed_out: bool = False) -> str:
+    if task is None:
+        # Never started: either its branch ran out of time or had nothing to do.
+        return "timeout" if timed_out else "skipped"
+    if task.cancelled() or not task.done():
+        return "timeout"
+    return "error" if task.exception() is not None else "ok"
+
+
+def _task_value(task: Optional[asyncio.Future], default: Any = None) -> Any:
+    return task.result() if _source_status(task) == "ok" else default
+
+
+def _source_value(name: str, task: Optional[asyncio.Future]) -> Any:
+    value = _task_value(task)
+    if name in PROFILE_FIELDS and value is not None:
+        value = value.get(PROFILE_FIELDS[name])
+    return value
+
+
+async def analyze_company(
+    company_name: str,
+    deadline: Optional[float] = None,
+    on_source: Optional[Callable[[str, str, Any], None]] = None,
+    use_reference: bool = True,
+) -> Dict[str, Any]:
+    """Gather Wikidata, Yahoo Finance and competitor data for a company.
+
+    The Wikidata and Yahoo chains run concurrently; competitors are fetched
+    once both have settled. Whatever has finished when ``deadline`` seconds
+    elapse is returned, with a per-source status under ``sources``.
+    ``on_source(name, status, value)`` is called as each source finishes.
+
+    For companies in the local reference index the ticker and competitors
+    come from the index (status ``local``) instead of Yahoo searches.
+
+    Concurrent calls with the same normalized name and options share one
+    run; calls with ``on_source`` always run on their own so each caller
+    gets its callbacks.
+    """
+    deadline = deadline or DEFAULT_DEADLINE
+    if on_source is not None:
+        return await _analyze_company(company_name, deadline, on_source, use_reference)
+    return await _analysis_flight.do(
+        (name_key(company_name), deadline, use_reference),
+        lambda: _analyze_company(company_name, deadline, None, use_reference),
+    )
+
+
+async def _analyze_company(
+    company_name: str,
+    deadline: float,
+    on_source: Optional[Callable[[str, str, Any], None]],
+    use_reference: bool,
+) -> Dict[str, Any]:
+    loop = asyncio.get_running_loop()
+    tasks: Dict[str, asyncio.Future] = {}
+    local = set()
+    reference = (
+        await loop.run_in_executor(_executor, lookup_company, company_name)
+        if use_reference
+        else None
+    )
+
+    def status(name: str) -> str:
+        return "local" if name in local else _source_status(tasks.get(name))
+
+    def register(name: str, task: asyncio.Future) -> asyncio.Future:
+        tasks[name] = task
+        if on_source:
+
+            def notify(done: asyncio.Future) -> None:
+                if not done.cancelled():
+                    on_source(name, status(name), _source_value(name, done))
+
+            task.add_done_callback(notify)
+        return task
+
+    def resolved(name: str, value: Any) -> asyncio.Future:
+        local.add(name)
+        future = loop.create_future()
+        future.set_result(value)
+        return register(name, future)
+
+    def start(name: str, func, *args) -> asyncio.Task:
+        return register(
+            name,
+            asyncio.ensure_future(loop.run_in_executor(_executor, func, *args)),
+        )
+
+    async def wikidata_branch() -> None:
+        wikidata_id = await start("wikidata_id", get_wikidata_id, company_name)
+        if wikidata_id:
+            profile = start("wikidata_details", get_entity_profile, wikidata_id)
+            register("funding_rounds", profile)
+            await profile
+
+    async def yahoo_branch() -> None:
+        if reference and reference.get("ticker"):
+            ticker = await resolved("ticker", reference["ticker"])
+        else:
+            ticker = await start("ticker", get_ticker_from_name, company_name)
+        if ticker:
+            await start("financial_data", get_company_financials, ticker)
+
+    wikidata = asyncio.ensure_future(wikidata_branch())
+    yahoo = asyncio.ensure_future(yahoo_branch())
+
+    async def competitors_branch() -> None:
+        if reference and reference.get("peers"):
+            resolved("competitors", reference["peers"])
+            return
+        await asyncio.gather(wikidata, yahoo, return_exceptions=True)
+        profile = _task_value(tasks.get("wikidata_details"), {}) or {}
+        details = profile.get("details", {})
+        await start(
+            "competitors",
+            lambda: get_competitors(
+                company_name=company_name,
+                wikidata_id=_task_value(tasks.get("wikidata_id")),
+                ticker=_task_value(tasks.get("ticker")),
+                industry=details.get("Industry"),
+            ),
+        )
+
+    competitors = asyncio.ensure_future(competitors_branch())
+    branches = {"wikidata": wikidata, "yahoo": yahoo, "competitors": competitors}
+    _, pending = await asyncio.wait(branches.values(), timeout=deadline)
+    for task in list(pending) + list(tasks.values()):
+        if not task.done():
+            task.cancel()
+    if pending:
+        logger.warning(
+            f"Company analysis for {company_name} hit the {deadline}s deadline"
+        )
+
+    response_data: Dict[str, Any] = {
+        "company_name": company_name,
+        "wikidata_id": _task_value(tasks.get("wikidata_id")),
+        "timestamp": datetime.now().isoformat(),
+    }
+    if reference is not None:
+        response_data["reference"] = reference
+    elif use_reference:
+        suggestion = await loop.run_in_executor(
+            _executor, suggest_company, company_name
+        )
+        if suggestion:
+            response_data["suggestion"] = suggestion
+    for name in SOURCES:
+        task = tasks.get(name)
+        if task is not None and name != "wikidata_id":
+            response_data[name] = _source_value(name, task)
+    response_data["sources"] = {
+        name: (
+            "local"
+            if name in local
+            else _source_status(tasks.get(name), branches[branch] in pending)
+        )
+        for name, branch in SOURCES.items()
+    }
+    for name, task in tasks.items():
+        if _source_status(task) == "error":
+            logger.error(f"{name} failed for {company_name}: {task.exception()}")
+    return response_data
@@ -1,22 +1,28 @@
 import sys
 from pathlib import Path
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, AsyncIterator, Tuple
 import json
 import logging
 import asyncio
+import hashlib
+import re
+import sqlite3
 from dotenv import load_dotenv
 import os
-import nest_asyncio
 
 # Add this import at the top:
 from file_manager import FileManager
 
 from gemini_model import GeminiModel
-from context_loader import ContextLoader
+from context_loader import ContextCache
+from category_matcher import CategoryMatcher
+from peer_analytics import nansum
+from name_resolution import get_name_resolver, name_key, normalize_name
+from reference_index import index_stats, index_version, lookup_company
+from response_cache import ResponseCache, make_cache_key, normalize_key_text
 from models.company_models import create_categorization_result
 from config import get_config
-
-nest_asyncio.apply()
+from ttl_cache import AsyncSingleflight
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -35,6 +41,9 @@ class DomainCategorizer:
         except Exception as e:
             logger.warning(f"Error loading categories: {e}, using empty default.")
             self.categories = {"byType": {}}
+        self.matcher = self._build_matcher()
+        self._inflight = AsyncSingleflight()
+        self.context_cache = ContextCache(Path(self.config.get("context_folder")))
 
         if self.config.get("use_ai"):
             try:
@@ -45,6 +54,39 @@ class DomainCategorizer:
         else:
             self.model = None
 
+        self.response_cache = None
+        if self.model and self.config.get("cache_enabled", True):
+            try:
+                self.response_cache = ResponseCache(
+                    Path(self.config["cache_folder"]) / "llm_responses.sqlite",
+                    ttl_seconds=self.config.get("llm_cache_ttl", 7 * 24 * 3600),
+                    max_entries=self.config.get("llm_cache_max_entries", 10000),
+                )
+            except Exception as e:
+                logger.warning(f"LLM response cache unavailable: {e}")
+
+        self.result_store = None
+        if self.config.get("result_store", True):
+            try:
+                self.result_store = ResponseCache(
+                    Path(self.config["cache_folder"]) / "results.sqlite",
+                    ttl_seconds=self.config.get("result_store_ttl", 30 * 24 * 3600),
+                    max_entries=self.config.get("result_store_max_entries", 100000),
+                )
+            except Exception as e:
+                logger.warning(f"Result store unavailable: {e}")
+        self.categories_version = hashlib.sha256(
+            json.dumps(self.categories, sort_keys=True).encode("utf-8")
+        ).hexdigest()[:16]
+        # Batched and single prompts share cache entries, so both templates
+        # feed the version hash.
+        self.prompt_version = hashlib.sha256(
+            (
+                self._prepare_category_prompt("{company_name}")
+                + self._prepare_batch_category_prompt(["{company_name}"])
+            ).encode("utf-8")
+        ).hexdigest()[:16]
+
     # Add new helper method to remove keys with None or empty string values.
     def _clean_dict(self, data: Any) -> Any:
         if isinstance(data, dict):
@@ -53,7 +95,7 @@ class DomainCategorizer:
                 for k, v in data.items()
                 if v is not None and (not isinstance(v, str) or v.strip() != "")
             }
-        elif isinstance(data, list):
+        elif isinstance(data, (list, tuple)):
             return [self._clean_dict(item) for item in data]
         else:
             return data
@@ -102,6 +144,17 @@ class DomainCategorizer:
                                 subcategories.extend(sublist)
         return subcategories
 
+    def _build_matcher(self) -> CategoryMatcher:
+        """Compile all category patterns into a single matcher."""
+        entries = []
+        for category, category_data in self.categories.get("byType", {}).items():
+            patterns = self._extract_patterns(category_data)
+            patterns.append(category.lower())
+            entries.append(
+                (category, patterns, self._get_subcategories(category_data))
+            )
+        return CategoryMatcher(entries)
+
     def _prepare_category_prompt(self, company_name: str) -> str:
         # Updated prompt with the new JSON format instructions.
         return f"""## Company Categorization and Market Analysis
@@ -147,6 +200,64 @@ You are an **AI specializing in company categorization and market analysis**. Yo
 }}
 ```
 
+Do not include any markdown or additional text.
+"""
+
+    def _prepare_batch_category_prompt(self, company_names: List[str]) -> str:
+        """Prompt covering several companies with one shared instruction block."""
+        numbered = "\n".join(
+            f"{i}. {json.dumps(name)}" for i, name in enumerate(company_names, 1)
+        )
+        return f"""## Company Categorization and Market Analysis (Batch)
+
+### Task Overview
+You are an **AI specializing in company categorization and market analysis**. Your task is to **categorize each company** in the list below based on its name and provide additional insights if the company is relevant or has direct competitors.
+
+### Companies
+{numbered}
+
+### Instructions
+
+1. **Categorization**
+   - Analyze each company name independently.
+   - Assign each company to **one of the available categories** exactly as provided.
+   - If uncertain, select the **most appropriate** category and assign a **confidence score** between **0.0** and **1.0**.
+
+2. **Justification**
+   - Provide a **concise yet clear explanation** of why the chosen category fits best.
+
+3. **Market Analysis for Relevant Companies**
+   - If a company is relevant (related or competitive), gather and return the following:
+     - **Names** of related companies
+     - **Total market capitalization**
+     - **Total addressable market**
+     - **Competitive landscape overview**
+     - **Market share distribution**
+     - **Any other relevant remarks or insights**
+
+4. **Structured Output Format**
+   - Return a JSON array with **exactly one object per company, in the same order as the list**.
+   - Copy each company name into the `company` field exactly as given.
+
+```json
+[
+    {{
+        "company": "company name as given",
+        "category": "category_name",
+        "confidence": 0.95,
+        "reasoning": "Brief explanation of why this category was chosen",
+        "related_companies": {{
+            "names": "value",
+            "total_market_cap": "value",
+            "total_addressable_market": "value",
+            "competitive_landscape": "value",
+            "market_share": "value",
+            "remarks": "value"
+        }}
+    }}
+]
+```
+
 Do not include any markdown or additional text.
 """
 
@@ -157,6 +268,11 @@ Do not include any markdown or additional text.
             return None
 
         try:
+            cache_key = self._ai_cache_key(company_name)
+            cached_text = (await self._cached_responses([cache_key])).get(cache_key)
+            if cached_text is not None:
+                return self._parse_ai_response(cached_text, company_name)
+
             response = await self.model.generate(
                 self._prepare_category_prompt(company_name),
                 temperature=0.1,
@@ -165,23 +281,256 @@ Do not include any markdown or additional text.
             if not response.text:
                 raise ValueError("Empty response from API")
 
-            response_text = response.text.strip()
-            if "```json" in response_text:
-                response_text = response_text[
-                    response_text.find("{") : response_text.rfind("}") + 1
-                ]
-
-            return self._parse_ai_response(response_text, company_name)
+            return await self._finish_ai_response(
+                response.text, company_name, cache_key
+            )
 
         except Exception as e:
             logger.error(f"AI categorization failed for {company_name}: {e}")
             return None
 
+    async def _cached_responses(self, cache_keys: List[str]) -> Dict[str, str]:
+        """Cached model answers for ``cache_keys``, read off the event loop."""
+        if not self.response_cache:
+            return {}
+        return await asyncio.to_thread(self.response_cache.get_many, cache_keys)
+
+    async def _cache_responses(self, entries: Dict[str, str]) -> None:
+        if self.response_cache and entries:
+            await asyncio.to_thread(self.response_cache.set_many, entries)
+
+    async def _finish_ai_response(
+        self, raw_text: str, company_name: str, cache_key: str
+    ) -> Dict:
+        """Trim, parse and cache a complete model answer."""
+        response_text = raw_text.strip()
+        if "```json" in response_text:
+            response_text = response_text[
+                response_text.find("{") : response_text.rfind("}") + 1
+            ]
+
+        result = self._parse_ai_response(response_text, company_name)
+        # Only keep responses that parsed, so a malformed answer is retried.
+        if "plaintext" not in result:
+            await self._cache_responses({cache_key: response_text})
+        return result
+
+    async def stream_company_ai(
+        self, company_name: str
+    ) -> AsyncIterator[Tuple[str, Any]]:
+        """Stream AI categorization as ``("chunk", text)`` pieces while Gemini
+        generates, followed by one ``("result", parsed_result)``."""
+        if not self.model:
+            logger.warning("AI categorization skipped - model not available")
+            yield "result", None
+            return
+
+        cache_key = self._ai_cache_key(company_name)
+        cached_text = (await self._cached_responses([cache_key])).get(cache_key)
+        if cached_text is not None:
+            yield "result", self._parse_ai_response(cached_text, company_name)
+            return
+
+        parts = []
+        try:
+            async for text in self.model.generate_stream(
+                self._prepare_category_prompt(company_name)
+            ):
+                parts.append(text)
+                yield "chunk", text
+            if not parts:
+                raise ValueError("Empty response from API")
+            result = await self._finish_ai_response(
+                "".join(parts), company_name, cache_key
+            )
+        except Exception as e:
+            logger.error(f"AI categorization failed for {company_name}: {e}")
+            result = None
+        yield "result", result
+
+    async def categorize_companies_ai(
+        self, company_names: List[str]
+    ) -> Dict[str, Optional[Dict]]:
+        """Categorize several companies with a single batched prompt.
+
+        Cached companies are served locally; entries missing from or invalid
+        in the batched answer fall back to categorize_company_ai.
+        """
+        results: Dict[str, Optional[Dict]] = {}
+        if not self.model:
+            logger.warning("AI categorization skipped - model not available")
+            return {name: None for name in company_names}
+
+        pending = []
+        cache_keys = {name: self._ai_cache_key(name) for name in company_names}
+        cached = await self._cached_responses(list(cache_keys.values()))
+        for name in company_names:
+            cached_text = cached.get(cache_keys[name])
+            if cached_text is not None:
+                results[name] = self._parse_ai_response(cached_text, name)
+            elif name not in pending:
+                pending.append(name)
+
+        if len(pending) > 1:
+            try:
+                response = await self.model.generate(
+                    self._prepare_batch_category_prompt(pending),
+                    temperature=0.1,
+                )
+                if not response.text:
+                    raise ValueError("Empty response from API")
+                entries = self._parse_batch_ai_response(response.text, pending)
+                answers = {}
+                for name, entry in entries.items():
+                    entry_text = json.dumps(entry)
+                    results[name] = self._parse_ai_response(entry_text, name)
+                    answers[cache_keys[name]] = entry_text
+                await self._cache_responses(answers)
+            except Exception as e:
+                logger.error(f"Batched AI categorization failed: {e}")
+
+        fallback = [name for name in pending if name not in results]
+        if fallback and len(pending) > 1:
+            logger.info(f"Falling back to single prompts for {len(fallback)} companies")
+        for name, result in zip(
+            fallback,
+            await asyncio.gather(*(self.categorize_company_ai(n) for n in fallback)),
+        ):
+            results[name] = result
+        return results
+
+    def _parse_batch_ai_response(
+        self, response_text: str, company_names: List[str]
+    ) -> Dict[str, Dict]:
+        """Split a batched answer into per-company entries.
+
+        Entries are matched by their ``company`` field. Only when no entry
+        names its company and the array has one entry per requested company
+        are they matched by position. Unmatched entries and entries without a
+        category are dropped so the caller can retry them individually.
+        """
+        array_match = re.search(r"(\[.*\])", response_text, re.DOTALL)
+        if not array_match:
+            raise ValueError("No JSON array in batched response")
+        entries = json.loads(array_match.group(1))
+        if not isinstance(entries, list):
+            raise ValueError("Batched response is not a JSON array")
+
+        by_name = {normalize_key_text(name): name for name in company_names}
+        positional = len(entries) == len(company_names) and not any(
+            isinstance(entry, dict) and entry.get("company") for entry in entries
+        )
+        parsed: Dict[str, Dict] = {}
+        for position, entry in enumerate(entries):
+            if not isinstance(entry, dict) or not entry.get("category"):
+                continue
+            if positional:
+                name = company_names[position]
+            else:
+                name = by_name.get(normalize_key_text(entry.get("company", "")))
+            if name is not None and name not in parsed:
+                parsed[name] = entry
+        return parsed
+
+    def _ai_cache_key(self, company_name: str) -> str:
+        return make_cache_key(
+            name_key(company_name),
+            self.prompt_version,
+            getattr(self.model, "model_name", None),
+            getattr(self.model, "generation_config", None),
+        )
+
+    def _ai_enabled(self) -> bool:
+        return bool(self.config["use_ai"] and self.model)
+
+    def _result_fingerprint(self, clean_output: bool) -> List[Any]:
+        """Everything besides the company name that a stored result depends
+        on; changing any of it invalidates the stored results."""
+        ai_enabled = self._ai_enabled()
+        return [
+            bool(clean_output),
+            self.categories_version,
+            self.context_cache.version,
+            self.config.get("context_mode", "reference"),
+            index_version() if self.config.get("reference_index", True) else None,
+            self.prompt_version if ai_enabled else None,
+            getattr(self.model, "model_name", None) if ai_enabled else None,
+            getattr(self.model, "generation_config", None) if ai_enabled else None,
+        ]
+
+    def _result_keys(self, company_names: List[str], clean_output: bool) -> Dict:
+        self.context_cache.get()
+        fingerprint = self._result_fingerprint(clean_output)
+        return {
+            name: make_cache_key(fingerprint, normalize_name(name))
+            for name in company_names
+        }
+
+    def has_stored_results(
+        self, company_names: List[str], clean_output: bool = False
+    ) -> List[str]:
+        """Those of ``company_names`` with a usable stored result; cheaper
+        than stored_results as no results are read."""
+        if self.result_store is None or not company_names:
+            return []
+        keys = self._result_keys(company_names, clean_output)
+        try:
+            present = self.result_store.contains_many(keys.values())
+        except sqlite3.Error as e:
+            logger.warning(f"Result store lookup failed: {e}")
+            return []
+        return [name for name, key in keys.items() if key in present]
+
+    def stored_results(
+        self, company_names: List[str], clean_output: bool = False
+    ) -> Dict[str, Dict]:
+        """Stored results for those of ``company_names`` whose inputs have
+        not changed since they were categorized."""
+        if self.result_store is None or not company_names:
+            return {}
+        keys = self._result_keys(company_names, clean_output)
+        try:
+            found = self.result_store.get_many(keys.values())
+        except sqlite3.Error as e:
+            logger.warning(f"Result store lookup failed: {e}")
+            return {}
+        return {
+            name: json.loads(found[key]) for name, key in keys.items() if key in found
+        }
+
+    def _store_results(self, results: Dict[str, Dict], clean_output: bool) -> None:
+        if self.result_store is None or not results:
+            return
+        keys = self._result_keys(list(results), clean_output)
+        try:
+            self.result_store.set_many(
+                {
+                    keys[name]: json.dumps(result, default=str)
+                    for name, result in results.items()
+                }
+            )
+        except sqlite3.Error as e:
+            logger.warning(f"Could not store {len(results)} result(s): {e}")
+
+    def cache_stats(self) -> Dict:
+        return {
+            "llm_responses": (
+                self.response_cache.stats() if self.response_cache else None
+            ),
+            "results": self.result_store.stats() if self.result_store else None,
+            "context": self.context_cache.stats(),
+            "reference_index": index_stats(),
+            "names": get_name_resolver().stats(),
+            "inflight": {
+                "running": len(self._inflight),
+                "coalesced": self._inflight.coalesced,
+            },
+        }
+
     def _parse_ai_response(self, response_text: str, company_name: str) -> Dict:
         """Parse AI response. If JSON parsing fails, return plain text.
         Enhanced extraction using regex to capture JSON content.
         """
-        import re  # ensure regex module is imported
 
         # Attempt to extract JSON substring using regex
         json_match = re.search(r"(\{.*\})", response_text, re.DOTALL)
@@ -218,11 +567,11 @@ Do not include any markdown or additional text.
             "competition_analysis": {
                 "competitors": {
                     "names": [comp.get("name", "") for comp in competitors],
-                    "total_market_cap": sum(
-                        comp.get("market_cap", 0) for comp in competitors
+                    "total_market_cap": nansum(
+                        [comp.get("market_cap") for comp in competitors]
                     ),
-                    "market_share": sum(
-                        comp.get("market_share", 0) for comp in competitors
+                    "market_share": nansum(
+                        [comp.get("market_share") for comp in competitors]
                     ),
                     "competitive_landscape": "Detailed analysis available in raw_market_data",
                 },
@@ -240,37 +589,70 @@ Do not include any markdown or additional text.
             "market_analysis": market_analysis_full,  # New key to populate market_analysis section
         }
 
+    def warm_up(self) -> None:
+        """Load the context, the reference index and the name index now
+        rather than on the first request. Blocking."""
+        self.context_cache.get()
+        get_name_resolver()
+        if self.config.get("reference_index", True):
+            lookup_company("")
+
+    def _load_references(self, company_names: List[str]) -> Dict[str, Optional[Dict]]:
+        # Blocking (context folder scan, reference index); run in a thread.
+        # Refreshing the context up front makes a bad folder fail fast.
+        self.context_cache.get()
+        return {name: self.lookup_reference(name) for name in company_names}
+
+    def lookup_reference(self, company_name: str) -> Optional[Dict]:
+        """Local data/ record for a known company, if the index is enabled."""
+        if not self.config.get("reference_index", True):
+            return None
+        return lookup_company(company_name)
+
     def categorize_company_rules(self, company_name: str) -> Dict[str, List]:
-        """Rule-based categorization using plain dictionaries."""
-        company_name = company_name.lower()
+        """Rule-based categorization using the precompiled category matcher."""
         matches: Dict[str, List] = {}
-        for category, category_data in self.categories.get("byType", {}).items():
-            patterns = self._extract_patterns(category_data)
-            patterns.append(category.lower())
-            if any(pattern in company_name for pattern in patterns):
-                subcats = self._get_subcategories(category_data)
-                # Use plain dictionary instead of RuleBasedCategory
-                matches[category] = [{"category": category, "subcategories": subcats}]
+        for index in self.matcher.match(company_name.lower()):
+            category = self.matcher.categories[index]
+            subcats = list(self.matcher.subcategories[index])
+            matches[category] = [{"category": category, "subcategories": subcats}]
         return matches
 
-    async def categorize_company(
-        self, company_name: str, clean_output: bool = False
-    ) -> Dict:
-        """Complete categorization with both rule-based and AI analysis.
-        Uses context loaded from self.config['context_folder'].
+    def _result_context(
+        self,
+        company_name: str,
+        rule_based: Dict,
+        ai_based: Optional[Dict],
+        reference: Optional[Dict] = None,
+    ) -> Tuple[str, Dict]:
+        """Context version plus the context to embed in a result.
+
+        In the default "reference" mode only entries relevant to the company
+        and its matched categories are embedded; the full context is served
+        once from the /context endpoint. "full" embeds everything.
         """
+        if self.config.get("context_mode", "reference") == "full":
+            return self.context_cache.get_versioned()
+        terms = [company_name, *rule_based]
+        if isinstance(ai_based, dict):
+            ai_category = (ai_based.get("raw_market_data") or {}).get("category")
+            if isinstance(ai_category, str):
+                terms.append(ai_category)
+        if reference:
+            terms.extend(reference.get("industry", []))
+        return self.context_cache.select_versioned(terms)
+
+    def _build_result(
+        self,
+        company_name: str,
+        ai_based: Optional[Dict],
+        clean_output: bool,
+        reference: Optional[Dict] = None,
+    ) -> Dict:
         rule_based = self.categorize_company_rules(company_name)
-        context = ContextLoader.load_all_context(
-            Path(self.config.get("context_folder"))
+        context_version, context = self._result_context(
+            company_name, rule_based, ai_based, reference
         )
-
-        ai_based = None
-        if self.config["use_ai"] and self.model:
-            try:
-                ai_based = await self.categorize_company_ai(company_name)
-            except Exception as e:
-                logger.error(f"AI categorization failed: {str(e)}")
-
         result = create_categorization_result(
             rule_based=rule_based,
             ai_based=ai_based,
@@ -280,8 +662,84 @@ Do not include any markdown or additional text.
                 if (ai_based and isinstance(ai_based, dict))
                 else None
             ),
+            context_version=context_version,
+            reference=reference,
         )
 
         if clean_output:
             result = self._clean_dict(result)
         return result
+
+    async def categorize_company(
+        self, company_name: str, clean_output: bool = False
+    ) -> Dict:
+        """Complete categorization with both rule-based and AI analysis.
+        Uses context loaded from self.config['context_folder']. Companies
+        found in the local reference index skip the AI call.
+
+        Concurrent calls for the same company (by normalized name) and
+        options share one computation and receive the same result object.
+        """
+        return await self._inflight.do(
+            (name_key(company_name), bool(clean_output)),
+            lambda: self._categorize_company(company_name, clean_output),
+        )
+
+    async def _categorize_company(self, company_name: str, clean_output: bool) -> Dict:
+        references = await asyncio.to_thread(self._load_references, [company_name])
+        reference = references[company_name]
+        ai_based = None
+        if reference is None and self.config["use_ai"] and self.model:
+            try:
+                ai_based = await self.categorize_company_ai(company_name)
+            except Exception as e:
+                logger.error(f"AI categorization failed: {str(e)}")
+
+        return await asyncio.to_thread(
+            self._build_result, company_name, ai_based, clean_output, reference
+        )
+
+    async def categorize_companies(
+        self, company_names: List[str], clean_output: bool = False
+    ) -> List[Dict]:
+        """Categorize several companies, packing the AI step into one prompt.
+
+        Returns results in the same order as ``company_names``. Companies
+        found in the local reference index are left out of the prompt.
+        Complete results are saved to the result store; see stored_results.
+        """
+        references = await asyncio.to_thread(self._load_references, company_names)
+        unknown = [name for name in company_names if references[name] is None]
+        ai_results: Dict[str, Optional[Dict]] = {}
+        if unknown and self.config["use_ai"] and self.model:
+            try:
+                ai_results = await self.categorize_companies_ai(unknown)
+            except Exception as e:
+                logger.error(f"AI categorization failed: {str(e)}")
+
+        # Building a result rescans the context folder, so it runs in a thread.
+        results = await asyncio.to_thread(
+            lambda: [
+                self._build_result(
+                    name, ai_results.get(name), clean_output, references[name]
+                )
+                for name in company_names
+            ]
+        )
+        # Rows whose AI step failed are not stored, so the next run retries them.
+        ai_failed = self._ai_enabled() and {
+            name
+            for name in unknown
+            if not isinstance(ai_results.get(name), dict)
+            or "plaintext" in ai_results[name]
+        }
+        await asyncio.to_thread(
+            self._store_results,
+            {
+                name: result
+                for name, result in zip(company_names, results)
+                if not ai_failed or name not in ai_failed
+            },
+            clean_output,
+        )
+        return results
@@ -35,6 +35,31 @@ def get_context_folder() -> Path:
     return default_path
 
 
+def get_data_folder() -> Path:
+    data_path = os.getenv("DATA_FOLDER")
+    return Path(data_path) if data_path else Path(__file__).parent / "data"
+
+
+def get_cache_folder() -> Path:
+    cache_path = os.getenv("CACHE_FOLDER")
+    p = Path(cache_path) if cache_path else Path(__file__).parent / ".cache"
+    p.mkdir(parents=True, exist_ok=True)
+    return p
+
+
+def get_request_deadline(value=None, default=None) -> float:
+    """Per-request deadline in seconds: ``value`` if given, else ``default``
+    or REQUEST_DEADLINE, capped at MAX_REQUEST_DEADLINE."""
+    if default is None:
+        default = float(os.getenv("REQUEST_DEADLINE", "60"))
+    limit = float(os.getenv("MAX_REQUEST_DEADLINE", "300"))
+    try:
+        deadline = float(value) if value not in (None, "") else default
+    except (TypeError, ValueError):
+        deadline = default
+    return min(deadline, limit) if deadline > 0 else default
+
+
 def get_config() -> dict:
     current_dir = Path(__file__).parent
     categories_file = current_dir / "categories.json"
@@ -47,4 +72,21 @@ def get_config() -> dict:
         "gemini_api_key": os.getenv("GEMINI_API_KEY"),
         "use_ai": os.getenv("USE_AI", "true").lower() == "true",
         "context_folder": str(get_context_folder()),
+        # "reference" embeds only relevant context entries; "full" embeds all.
+        "context_mode": os.getenv("CONTEXT_MODE", "reference").lower(),
+        # Answer companies found in data/ from the local reference index.
+        "reference_index": os.getenv("REFERENCE_INDEX", "true").lower() == "true",
+        "batch_concurrency": int(os.getenv("BATCH_CONCURRENCY", "8")),
+        "batch_item_timeout": float(os.getenv("BATCH_ITEM_TIMEOUT", "60")),
+        "ai_batch_size": int(os.getenv("AI_BATCH_SIZE", "10")),
+        "cache_enabled": os.getenv("CACHE_ENABLED", "true").lower() == "true",
+        "cache_folder": str(get_cache_folder()),
+        "llm_cache_ttl": float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600))),
+        "llm_cache_max_entries": int(os.getenv("LLM_CACHE_MAX_ENTRIES", "10000")),
+        # Finished categorizations reused by file runs until an input changes.
+        "result_store": os.getenv("RESULT_STORE", "true").lower() == "true",
+        "result_store_ttl": float(os.getenv("RESULT_STORE_TTL", str(30 * 24 * 3600))),
+        "result_store_max_entries": int(
+            os.getenv("RESULT_STORE_MAX_ENTRIES", "100000")
+        ),
     }
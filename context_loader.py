@@ -1,7 +1,23 @@
 from pathlib import Path
+from functools import lru_cache
+import hashlib
 import json
+import logging
+import re
+import threading
 import pandas as pd
-from typing import Dict, Any
+from typing import Dict, Any, Iterable, List, Optional, Sequence, Tuple
+
+from name_resolution import LEGAL_SUFFIXES
+from snapshot import read_table
+
+logger = logging.getLogger(__name__)
+
+CONTEXT_SUFFIXES = (".json", ".xlsx", ".xls", ".csv")
+# Memoized relevant-context selections kept per context version.
+MAX_SELECTIONS = 4096
+# Words that never make a context value relevant on their own.
+FILLER_WORDS = {"a", "an", "and", "at", "by", "for", "in", "of", "on", "the", "to"}
 
 
 class ContextLoader:
@@ -20,7 +36,7 @@ class ContextLoader:
         }
 
         for file_path in directory.glob("**/*"):
-            if file_path.suffix.lower() in (".json", ".xlsx", ".xls", ".csv"):
+            if file_path.suffix.lower() in CONTEXT_SUFFIXES:
                 file_context = ContextLoader.load_file(file_path)
                 ContextLoader._merge_context(context, file_context)
 
@@ -44,9 +60,7 @@ class ContextLoader:
                 return json.load(f)
 
         if suffix in (".xlsx", ".xls", ".csv"):
-            df = (
-                pd.read_csv(file_path) if suffix == ".csv" else pd.read_excel(file_path)
-            )
+            df = read_table(file_path)
             return ContextLoader._parse_excel(df)
 
         raise ValueError(f"Unsupported file type: {suffix}")
@@ -65,3 +79,205 @@ class ContextLoader:
                 context["competitors"][col] = df[col].dropna().tolist()
 
         return context
+
+
+class ReadOnlyDict(dict):
+    """dict that rejects mutation; still serializable with json/jsonify."""
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("Context is read-only")
+
+    __setitem__ = __delitem__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+
+def _freeze(value: Any) -> Any:
+    """Read-only copy of ``value``: dicts become ReadOnlyDicts and lists
+    tuples, recursively."""
+    if isinstance(value, dict) and not isinstance(value, ReadOnlyDict):
+        return ReadOnlyDict((k, _freeze(v)) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+@lru_cache(maxsize=65536)
+def _tokens(text: str) -> Tuple[str, ...]:
+    return tuple(re.findall(r"\w+", text.lower()))
+
+
+def _contains(words: Sequence[str], phrase: Sequence[str]) -> bool:
+    """Whether ``phrase`` occurs in ``words`` as a run of whole words."""
+    size = len(phrase)
+    return size > 0 and any(
+        tuple(words[i : i + size]) == tuple(phrase)
+        for i in range(len(words) - size + 1)
+    )
+
+
+def _mentions(value: Any, terms: Tuple[str, ...]) -> bool:
+    """Whether ``value`` contains one of ``terms`` as whole words, or is
+    itself a phrase within one (e.g. "Acme" for "Acme Software"). Values
+    made only of filler words or legal suffixes ("and", "Inc") never
+    match the second way."""
+    words = _tokens(str(value))
+    if not words:
+        return False
+    specific = any(w not in FILLER_WORDS and w not in LEGAL_SUFFIXES for w in words)
+    for term in terms:
+        term_words = _tokens(term)
+        if _contains(words, term_words) or (specific and _contains(term_words, words)):
+            return True
+    return False
+
+
+class ContextCache:
+    """Change-aware cache over a context folder.
+
+    Each file is parsed once and re-parsed only when its mtime or size
+    changes. The merged context is rebuilt only when the set of files or one
+    of their signatures changes, and is handed out as a shared read-only
+    mapping rather than a copy.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self.hits = 0
+        self.misses = 0
+        self._files: Dict[Path, Tuple[Tuple[int, int], Dict[str, Any]]] = {}
+        self._order: List[Path] = []
+        self._merged: Dict[str, Any] = None
+        self._selections: Dict[Tuple[str, ...], Dict[str, Any]] = {}
+        self.version: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def _scan(self) -> List[Tuple[Path, Tuple[int, int]]]:
+        if not self.directory.is_dir():
+            raise ValueError(f"Invalid context directory: {self.directory}")
+        entries = []
+        for file_path in self.directory.glob("**/*"):
+            if file_path.suffix.lower() not in CONTEXT_SUFFIXES:
+                continue
+            try:
+                stat = file_path.stat()
+            except OSError:
+                continue
+            entries.append((file_path, (stat.st_mtime_ns, stat.st_size)))
+        return entries
+
+    def get(self) -> Dict[str, Any]:
+        """Return the merged context, re-parsing only changed files."""
+        with self._lock:
+            return self._refresh()
+
+    def _refresh(self) -> Dict[str, Any]:
+        # Caller holds self._lock.
+        entries = self._scan()
+        changed = [path for path, _ in entries] != self._order
+        for file_path, signature in entries:
+            cached = self._files.get(file_path)
+            if cached and cached[0] == signature:
+                self.hits += 1
+                continue
+            self.misses += 1
+            changed = True
+            self._files[file_path] = (
+                signature,
+                ContextLoader.load_file(file_path),
+            )
+
+        if changed or self._merged is None:
+            self._order = [path for path, _ in entries]
+            for stale in set(self._files) - set(self._order):
+                del self._files[stale]
+            merged = {
+                "categories": {},
+                "market_data": {},
+                "competitors": {},
+                "raw_data": {},
+            }
+            for file_path in self._order:
+                ContextLoader._merge_context(merged, self._files[file_path][1])
+            self._merged = _freeze(merged)
+            self.version = hashlib.sha256(
+                json.dumps(
+                    [(str(path), sig) for path, sig in entries], sort_keys=True
+                ).encode("utf-8")
+            ).hexdigest()[:16]
+            self._selections = {}
+            logger.debug(f"Rebuilt context from {len(self._order)} files")
+        return self._merged
+
+    def get_versioned(self) -> Tuple[str, Dict[str, Any]]:
+        """Return ``(version, context)`` as one consistent pair."""
+        with self._lock:
+            context = self._refresh()
+            return self.version, context
+
+    def select(self, terms: Iterable[str]) -> Dict[str, Any]:
+        """Context entries relevant to ``terms``; see select_versioned."""
+        return self.select_versioned(terms)[1]
+
+    def select_versioned(self, terms: Iterable[str]) -> Tuple[str, Dict[str, Any]]:
+        """``(version, entries)`` for the context entries relevant to
+        ``terms`` (category or company names), as one consistent pair.
+
+        A section key matching a term keeps its whole value; list values
+        otherwise keep only the matching items. Matching is on whole words;
+        see _mentions. Selections are memoized per context version.
+        """
+        version, context = self.get_versioned()
+        terms = tuple(sorted({t.lower() for t in terms if t and t.strip()}))
+        key = (version,) + terms
+        with self._lock:
+            cached = self._selections.get(key)
+        if cached is not None:
+            return version, cached
+
+        selected: Dict[str, Any] = {}
+        for section, entries in context.items():
+            if not isinstance(entries, dict):
+                continue
+            picked = {}
+            for name, value in entries.items():
+                if _mentions(name, terms):
+                    picked[name] = value
+                elif isinstance(value, (list, tuple)):
+                    items = [
+                        item
+                        for item in value
+                        if _mentions(item, terms)
+                    ]
+                    if items:
+                        picked[name] = items
+            if picked:
+                selected[section] = picked
+
+        selected = _freeze(selected)
+        with self._lock:
+            if len(self._selections) >= MAX_SELECTIONS:
+                self._selections.clear()
+            self._selections[key] = selected
+        return version, selected
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._files.clear()
+            self._order = []
+            self._merged = None
+            self._selections = {}
+            self.version = None
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "files": len(self._files),
+            "version": self.version,
+        }
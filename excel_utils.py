@@ -1,5 +1,13 @@
+import json
+import math
 import pandas as pd
-from typing import List
+from typing import Any, Iterator, List, Optional
+
+from snapshot import SNAPSHOTS_ENABLED, TABLE_SUFFIXES, is_fresh, load_columns
+
+# Rows read per pandas chunk for CSV input.
+DEFAULT_CHUNK_SIZE = 10000
+SUPPORTED_EXTENSIONS = (".xlsx", ".xls", ".csv", ".json", ".ndjson", ".jsonl")
 
 
 def read_excel_to_df(file_path: str, sheet_name: str = None) -> pd.DataFrame:
@@ -15,13 +23,106 @@ def load_companies_from_excel(
     return df[column].dropna().tolist()
 
 
-def load_companies_from_file(file_path: str, column: str = "Company") -> List[str]:
-    if file_path.lower().endswith((".xlsx", ".xls")):
-        df = read_excel_to_df(file_path)
-    elif file_path.lower().endswith(".csv"):
-        df = pd.read_csv(file_path)
-    else:
-        raise ValueError("Unsupported file format. Use .xlsx, .xls, or .csv.")
-    if column not in df.columns:
+def _clean_name(value: Any) -> Optional[str]:
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return None
+    name = str(value).strip()
+    return name or None
+
+
+def _iter_xlsx(file_path: str, column: str) -> Iterator[Any]:
+    """Stream one column of the first sheet using openpyxl read-only mode."""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        sheet = workbook.worksheets[0]
+        rows = sheet.iter_rows(values_only=True)
+        header = next(rows, None) or ()
+        headers = [str(cell).strip() if cell is not None else "" for cell in header]
+        if column not in headers:
+            raise ValueError(f"Column '{column}' not found in the file.")
+        col_idx = headers.index(column) + 1
+        for (value,) in sheet.iter_rows(
+            min_row=2, min_col=col_idx, max_col=col_idx, values_only=True
+        ):
+            yield value
+    finally:
+        workbook.close()
+
+
+def _iter_csv(file_path: str, column: str, chunk_size: int) -> Iterator[Any]:
+    header = pd.read_csv(file_path, nrows=0).columns
+    if column not in header:
         raise ValueError(f"Column '{column}' not found in the file.")
-    return df[column].dropna().tolist()
+    for chunk in pd.read_csv(file_path, usecols=[column], chunksize=chunk_size):
+        yield from chunk[column].tolist()
+
+
+def _record_name(record: Any, column: str) -> Any:
+    if isinstance(record, dict):
+        return record.get(column)
+    return record
+
+
+def _iter_json(file_path: str, column: str) -> Iterator[Any]:
+    """Accept a list of names, a list of objects with ``column``, or an object
+    holding such a list under ``companies``."""
+    with open(file_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = data.get("companies", data.get(column, []))
+    if not isinstance(data, list):
+        raise ValueError("JSON input must be a list of companies.")
+    for record in data:
+        yield _record_name(record, column)
+
+
+def _iter_ndjson(file_path: str, column: str) -> Iterator[Any]:
+    with open(file_path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield _record_name(json.loads(line), column)
+
+
+def iter_companies_from_file(
+    file_path: str, column: str = "Company", chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Iterator[str]:
+    """Lazily yield company names from a spreadsheet, CSV, JSON or NDJSON file.
+
+    Only the ``column`` column is read: tables with an up-to-date snapshot
+    are read from it, other xlsx files through openpyxl read-only mode, CSV
+    through chunked ``usecols`` reads, NDJSON line by line. Blank cells are
+    skipped.
+    """
+    lower = file_path.lower()
+    if SNAPSHOTS_ENABLED and lower.endswith(TABLE_SUFFIXES) and is_fresh(file_path):
+        # Compiled reference data: read the one column from its snapshot.
+        values = iter(load_columns(file_path, [column], build=False)[column])
+    elif lower.endswith(".xlsx"):
+        values = _iter_xlsx(file_path, column)
+    elif lower.endswith(".xls"):
+        # openpyxl cannot read legacy .xls; fall back to a single-column read.
+        df = pd.read_excel(file_path, usecols=lambda name: name == column)
+        if column not in df.columns:
+            raise ValueError(f"Column '{column}' not found in the file.")
+        values = iter(df[column].tolist())
+    elif lower.endswith(".csv"):
+        values = _iter_csv(file_path, column, chunk_size)
+    elif lower.endswith(".json"):
+        values = _iter_json(file_path, column)
+    elif lower.endswith((".ndjson", ".jsonl")):
+        values = _iter_ndjson(file_path, column)
+    else:
+        raise ValueError(
+            "Unsupported file format. Use .xlsx, .xls, .csv, .json or .ndjson."
+        )
+    for value in values:
+        name = _clean_name(value)
+        if name:
+            yield name
+
+
+def load_companies_from_file(file_path: str, column: str = "Company") -> List[str]:
+    return list(iter_companies_from_file(file_path, column))
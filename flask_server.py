@@ -1,24 +1,28 @@
 from flask import Flask, request, jsonify, Response
 import asyncio
+import json
 import threading
 import os
-import requests
 import logging
 from dotenv import load_dotenv
-from app import CompanyCategorizerApp
+from config import get_request_deadline
+from app import CompanyCategorizerApp, ndjson_line
 from flask_cors import CORS, cross_origin
 from flask_cors import CORS
-from datetime import datetime  # added from router.py
-from services import (
-    get_ticker_from_name,
-    get_company_financials,
-    get_competitors,
-)  # added from router.py
-from wikidata import (
-    get_wikidata_id,
-    get_wikidata_details,
-    get_funding_rounds,
-)  # added from router.py
+from services import get_company_financials  # added from router.py
+from services import get_bulk_financials, MAX_BULK_TICKERS
+from services import cache as services_cache
+from rate_limiter import limiter_stats
+from json_poster import delivery_stats, enqueue_json_result
+from company_analysis import analyze_company, DEFAULT_DEADLINE
+from peer_analytics import peer_comparison
+from streaming import (
+    STREAM_IDLE_TIMEOUT,
+    stream_categorization,
+    format_ndjson,
+    format_sse,
+)
+from wikidata import cache_stats as wikidata_cache_stats
 
 app = Flask(__name__)
 CORS(app)
@@ -40,7 +44,8 @@ def start_loop(loop):
 threading.Thread(target=start_loop, args=(loop,), daemon=True).start()
 
 
-def run_async_task(coro, timeout=10):
+def run_async_task(coro, timeout=None):
+    timeout = timeout or get_request_deadline()
     try:
         future = asyncio.run_coroutine_threadsafe(
             asyncio.wait_for(coro, timeout=timeout), loop
@@ -56,6 +61,37 @@ def health_check():
     return jsonify({"status": "ok"})
 
 
+@app.route("/cache_stats", methods=["GET"])
+def cache_stats_endpoint():
+    return jsonify(
+        dict(
+            instance.categorizer.cache_stats(),
+            wikidata=wikidata_cache_stats(),
+            services=services_cache.stats(),
+        )
+    )
+
+
+@app.route("/rate_limits", methods=["GET"])
+def rate_limits_endpoint():
+    return jsonify(limiter_stats())
+
+
+@app.route("/delivery_stats", methods=["GET"])
+def delivery_stats_endpoint():
+    return jsonify(delivery_stats())
+
+
+@app.route("/context", methods=["GET"])
+def context_endpoint():
+    version, context = instance.categorizer.context_cache.get_versioned()
+    if request.if_none_match.contains(version):
+        return Response(status=304)
+    response = jsonify({"version": version, "context": context})
+    response.set_etag(version)
+    return response
+
+
 @app.route("/categorize", methods=["POST"])
 def categorize_endpoint():
     company_name = request.args.get("query")
@@ -66,10 +102,11 @@ def categorize_endpoint():
         result = run_async_task(
             instance.categorizer.categorize_company(
                 company_name, clean_output=clean_param
-            )
+            ),
+            timeout=get_request_deadline(request.args.get("deadline")),
         )
         raw_data = result.get("raw_market_data", {})
-        post_response = post_json_result(raw_data)
+        post_response = enqueue_json_result(raw_data)
         return jsonify({"result": result, "post_response": post_response})
     except Exception as e:
         logger.error(f"/categorize error: {e}")
@@ -82,12 +119,24 @@ def categorize_file_endpoint():
     if not file_path:
         return jsonify({"error": "Missing file_path parameter"}), 400
     clean_param = request.args.get("clean", "false").lower() == "true"
+    if request.args.get("stream", "false").lower() == "true":
+
+        def generate():
+            results = instance.iter_file_results(file_path, clean_output=clean_param)
+            try:
+                for company, result in iterate_async(results):
+                    yield ndjson_line(company, result)
+            except TimeoutError as e:
+                yield json.dumps({"error": f"Error processing file: {e}"}) + "\n"
+
+        return Response(generate(), mimetype="application/x-ndjson")
     try:
         result = run_async_task(
-            instance.handle_file_input(file_path, clean_output=clean_param)
+            instance.handle_file_input(file_path, clean_output=clean_param),
+            timeout=get_request_deadline(request.args.get("deadline")),
         )
         raw_data = result.get("raw_market_data", {}) if isinstance(result, dict) else {}
-        post_response = post_json_result(raw_data)
+        post_response = enqueue_json_result(raw_data)
         return jsonify({"result": result, "post_response": post_response})
     except Exception as e:
         logger.error(f"/categorize_file error: {e}")
@@ -99,21 +148,37 @@ def post_json_endpoint():
     data = request.get_json()
     if not data:
         return jsonify({"error": "No JSON payload provided"}), 400
-    post_response = post_json_result(data)
+    post_response = enqueue_json_result(data)
     if post_response is None:
         return jsonify({"error": "Failed to post JSON result"}), 500
     return jsonify({"post_response": post_response})
 
 
-def generate_json_stream(company_name):
-    yield "{\n"
-    yield f'  "company": "{company_name}",\n'
-    yield '  "analysis": {\n'
-    yield '    "step1": "processing...",\n'
-    yield '    "step2": "processing..."\n'
-    yield "  },\n"
-    yield '  "final_result": "Category X"\n'
-    yield "}\n"
+def iterate_async(agen, idle_timeout=STREAM_IDLE_TIMEOUT):
+    """Drive an async generator on the background loop from a sync generator.
+
+    Raises TimeoutError when no item arrives within ``idle_timeout``; the
+    pending step is cancelled and the generator closed before it propagates.
+    """
+    try:
+        while True:
+            # wait_for cancels the step on timeout and waits for the
+            # cancellation, so the generator is idle again before aclose().
+            step = asyncio.wait_for(agen.__anext__(), idle_timeout)
+            try:
+                item = asyncio.run_coroutine_threadsafe(step, loop).result()
+            except StopAsyncIteration:
+                break
+            except asyncio.TimeoutError:
+                raise TimeoutError(f"No progress for {idle_timeout}s") from None
+            yield item
+    finally:
+        try:
+            asyncio.run_coroutine_threadsafe(agen.aclose(), loop).result(
+                timeout=idle_timeout
+            )
+        except Exception as e:
+            logger.warning(f"Could not close stream: {e}")
 
 
 @app.route("/stream_categorize", methods=["GET"])
@@ -121,7 +186,28 @@ def stream_categorize_endpoint():
     company_name = request.args.get("company_name")
     if not company_name:
         return jsonify({"error": "Missing company_name parameter"}), 400
-    return Response(generate_json_stream(company_name), mimetype="application/json")
+    enrich = request.args.get("enrich", "true").lower() == "true"
+    use_sse = request.args.get("format") == "sse" or (
+        "text/event-stream" in request.headers.get("Accept", "")
+    )
+    formatter = format_sse if use_sse else format_ndjson
+
+    def generate():
+        events = stream_categorization(
+            instance.categorizer, company_name, enrich=enrich
+        )
+        try:
+            for event in iterate_async(events):
+                yield formatter(event)
+        except TimeoutError as e:
+            error = {"event": "error", "company": company_name, "error": str(e)}
+            yield formatter(error)
+
+    return Response(
+        generate(),
+        mimetype="text/event-stream" if use_sse else "application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @app.route("/json", methods=["GET", "POST"])
@@ -153,7 +239,8 @@ def company_post():
         result = run_async_task(
             instance.categorizer.categorize_company(
                 company_name, clean_output=clean_param
-            )
+            ),
+            timeout=get_request_deadline(request.args.get("deadline")),
         )
         return jsonify({"result": result})
     except Exception as e:
@@ -173,7 +260,8 @@ def company_json_post():
         result = run_async_task(
             instance.categorizer.categorize_company(
                 company_name, clean_output=clean_param
-            )
+            ),
+            timeout=get_request_deadline(data.get("deadline")),
         )
         return jsonify({"result": result})
     except Exception as e:
@@ -190,16 +278,62 @@ def yfinance_data():
             return jsonify({"error": "Missing ticker in request body"}), 400
 
         ticker = data["ticker"].strip()
-        financial_data = get_company_financials(ticker)
+        financial_data = get_company_financials(ticker, sections=data.get("sections"))
         if not financial_data:
             return jsonify({"error": "Could not fetch financial data"}), 500
 
         return jsonify({"ticker": ticker, "financial_data": financial_data})
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         app.logger.exception("Unhandled exception in /api/yfinance")
         return jsonify({"error": f"An error occurred: {str(e)}"}), 500
 
 
+@app.route("/api/yfinance/bulk", methods=["POST"])
+@cross_origin()
+def yfinance_bulk_data():
+    try:
+        data = request.get_json()
+        tickers = data.get("tickers") if data else None
+        if not isinstance(tickers, list) or not tickers:
+            return jsonify({"error": "Missing tickers list in request body"}), 400
+        if len(tickers) > MAX_BULK_TICKERS:
+            return (
+                jsonify({"error": f"At most {MAX_BULK_TICKERS} tickers per request"}),
+                400,
+            )
+
+        return jsonify(get_bulk_financials(tickers, sections=data.get("sections")))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        app.logger.exception("Unhandled exception in /api/yfinance/bulk")
+        return jsonify({"error": f"An error occurred: {str(e)}"}), 500
+
+
+@app.route("/api/peer_comparison", methods=["POST"])
+@cross_origin()
+def peer_comparison_data():
+    try:
+        data = request.get_json()
+        if not data or "ticker" not in data:
+            return jsonify({"error": "Missing ticker in request body"}), 400
+        peers = data.get("peers") or []
+        if len(peers) + 1 > MAX_BULK_TICKERS:
+            return (
+                jsonify({"error": f"At most {MAX_BULK_TICKERS} tickers per request"}),
+                400,
+            )
+
+        return jsonify(peer_comparison(data["ticker"], peers))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        app.logger.exception("Unhandled exception in /api/peer_comparison")
+        return jsonify({"error": f"An error occurred: {str(e)}"}), 500
+
+
 @app.route("/api/company_analysis", methods=["POST"])
 @cross_origin()
 def company_analysis():
@@ -209,30 +343,15 @@ def company_analysis():
             return jsonify({"error": "Missing company_name in request body"}), 400
 
         company_name = data["company_name"].strip()
-        wikidata_id = get_wikidata_id(company_name)
-        response_data = {
-            "company_name": company_name,
-            "wikidata_id": wikidata_id,
-            "timestamp": datetime.now().isoformat(),
-        }
-
-        if wikidata_id:
-            response_data["wikidata_details"] = get_wikidata_details(wikidata_id)
-            response_data["funding_rounds"] = get_funding_rounds(wikidata_id)
-
-        ticker = get_ticker_from_name(company_name)
-        response_data["ticker"] = ticker
-
-        if ticker:
-            response_data["financial_data"] = get_company_financials(ticker)
-
-        response_data["competitors"] = get_competitors(
-            company_name=company_name,
-            wikidata_id=wikidata_id,
-            ticker=ticker,
-            industry=response_data.get("wikidata_details", {}).get("Industry"),
+        deadline = get_request_deadline(data.get("deadline"), DEFAULT_DEADLINE)
+        response_data = run_async_task(
+            analyze_company(
+                company_name,
+                deadline=deadline,
+                use_reference=str(data.get("use_reference", True)).lower() == "true",
+            ),
+            timeout=deadline + 1,
         )
-
         return jsonify(response_data)
 
     except Exception as e:
@@ -240,21 +359,6 @@ def company_analysis():
         return jsonify({"error": f"An error occurred: {str(e)}"}), 500
 
 
-def post_json_result(data):
-    post_url = os.getenv("POST_URL")
-    if not post_url:
-        logger.info("POST_URL not set, skipping posting JSON result")
-        return None
-    try:
-        response = requests.post(post_url, json=data)
-        response.raise_for_status()
-        logger.info(f"Posted JSON result to {post_url}")
-        return response.json()
-    except Exception as e:
-        logger.error(f"Failed to post JSON result: {e}")
-        return None
-
-
 if __name__ == "__main__":
     load_dotenv()
     debug_mode = os.getenv("FLASK_DEBUG", "false").lower() == "true"
@@ -2,7 +2,9 @@ import os
 import asyncio
 import logging
 import google.generativeai as genai
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, AsyncIterator
+
+from rate_limiter import get_limiter
 
 logger = logging.getLogger(__name__)
 
@@ -40,6 +42,7 @@ class GeminiModel:
             )
 
         genai.configure(api_key=self.api_key)
+        self.model_name = model_name
         self.generation_config = generation_config or self.DEFAULT_CONFIG
         self.model = genai.GenerativeModel(
             model_name=model_name, generation_config=self.generation_config
@@ -50,6 +53,7 @@ class GeminiModel:
         try:
             # Remove temperature if it exists, because generate_content_async() doesn't accept it.
             kwargs.pop("temperature", None)
+            await get_limiter("gemini").acquire_async()
             response = await self.model.generate_content_async(prompt, **kwargs)
 
             if not response or not hasattr(response, "text"):
@@ -61,6 +65,22 @@ class GeminiModel:
             logger.error(f"Gemini API error: {str(e)}")
             raise
 
+    async def generate_stream(self, prompt: str, **kwargs) -> AsyncIterator[str]:
+        """Yield response text chunks as they arrive from the API."""
+        kwargs.pop("temperature", None)
+        await get_limiter("gemini").acquire_async()
+        try:
+            response = await self.model.generate_content_async(
+                prompt, stream=True, **kwargs
+            )
+            async for chunk in response:
+                text = getattr(chunk, "text", None)
+                if text:
+                    yield text
+        except Exception as e:
+            logger.error(f"Gemini API streaming error: {str(e)}")
+            raise
+
     def generate_sync(self, prompt: str, **kwargs) -> Any:
         """
         Generate content synchronously.
@@ -73,6 +93,7 @@ class GeminiModel:
             Generated content response
         """
         kwargs.pop("temperature", None)
+        get_limiter("gemini").acquire()
         return self.model.generate_content(prompt, **kwargs)
 
     def start_chat(self, history: Optional[List] = None) -> Any:
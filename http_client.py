@@ -0,0 +1,112 @@
+import asyncio
+import os
+import random
+import threading
+from typing import Any, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+DEFAULT_TIMEOUT = (
+    float(os.getenv("HTTP_CONNECT_TIMEOUT", "3.05")),
+    float(os.getenv("HTTP_READ_TIMEOUT", "10")),
+)
+DEFAULT_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "10"))
+# Hosts we call heavily get their own pool size; override with
+# HTTP_POOL_SIZE_<HOST> where dots and dashes become underscores.
+HOST_POOL_SIZES = {
+    "www.wikidata.org": 10,
+    "query.wikidata.org": 10,
+    "query2.finance.yahoo.com": 10,
+}
+USER_AGENT = "Mozilla/5.0 (compatible; competitor-analysis)"
+
+
+class JitteredRetry(Retry):
+    """urllib3 Retry whose exponential backoff is spread with random jitter."""
+
+    def get_backoff_time(self) -> float:
+        backoff = super().get_backoff_time()
+        return random.uniform(0, backoff) if backoff else 0
+
+
+def _host_pool_size(host: str) -> int:
+    env_key = "HTTP_POOL_SIZE_" + host.upper().replace(".", "_").replace("-", "_")
+    return int(os.getenv(env_key, HOST_POOL_SIZES.get(host, DEFAULT_POOL_SIZE)))
+
+
+def _make_adapter(pool_size: int) -> HTTPAdapter:
+    retry = JitteredRetry(
+        total=int(os.getenv("HTTP_RETRIES", "3")),
+        backoff_factor=float(os.getenv("HTTP_BACKOFF", "0.5")),
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset({"GET", "HEAD", "OPTIONS"}),
+        raise_on_status=False,
+        respect_retry_after_header=True,
+    )
+    return HTTPAdapter(
+        pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry
+    )
+
+
+class HttpClient:
+    """Shared keep-alive session with per-host connection pools and retries."""
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT):
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update({"User-Agent": USER_AGENT})
+        self.session.mount("https://", _make_adapter(DEFAULT_POOL_SIZE))
+        self.session.mount("http://", _make_adapter(DEFAULT_POOL_SIZE))
+        self._mounted = set()
+        self._lock = threading.Lock()
+
+    def _ensure_host_pool(self, url: str) -> None:
+        parts = urlsplit(url)
+        prefix = f"{parts.scheme}://{parts.netloc}"
+        if prefix in self._mounted:
+            return
+        with self._lock:
+            if prefix not in self._mounted:
+                size = _host_pool_size(parts.hostname or "")
+                if size != DEFAULT_POOL_SIZE:
+                    self.session.mount(prefix, _make_adapter(size))
+                self._mounted.add(prefix)
+
+    def request(self, method: str, url: str, **kwargs: Any) -> requests.Response:
+        kwargs.setdefault("timeout", self.timeout)
+        self._ensure_host_pool(url)
+        return self.session.request(method, url, **kwargs)
+
+    def get(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    async def get_async(self, url: str, **kwargs: Any) -> requests.Response:
+        """Run a pooled GET on a worker thread so the event loop stays free."""
+        return await asyncio.to_thread(self.get, url, **kwargs)
+
+    async def post_async(self, url: str, **kwargs: Any) -> requests.Response:
+        return await asyncio.to_thread(self.post, url, **kwargs)
+
+    def close(self) -> None:
+        self.session.close()
+
+
+_client: Optional[HttpClient] = None
+_client_lock = threading.Lock()
+
+
+def get_http_client() -> HttpClient:
+    """Return the process-wide HttpClient."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = HttpClient()
+    return _client
+
@@ -0,0 +1,284 @@
+import atexit
+import json
+import os
+import logging
+import queue
+import random
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import get_cache_folder
+from http_client import get_http_client
+
+logger = logging.getLogger(__name__)
+
+# Results per POST; with 1 each result is posted as a single JSON object,
+# otherwise as a JSON array.
+BATCH_SIZE = int(os.getenv("POST_BATCH_SIZE", "50"))
+FLUSH_INTERVAL = float(os.getenv("POST_FLUSH_INTERVAL", "1.0"))
+MAX_QUEUE = int(os.getenv("POST_QUEUE_SIZE", "10000"))
+MAX_RETRIES = int(os.getenv("POST_RETRIES", "5"))
+BACKOFF_BASE = float(os.getenv("POST_BACKOFF", "0.5"))
+BACKOFF_MAX = float(os.getenv("POST_BACKOFF_MAX", "30"))
+FLUSH_TIMEOUT = float(os.getenv("POST_FLUSH_TIMEOUT", "10"))
+
+
+def post_json_result(data):
+    post_url = os.getenv("POST_URL")
+    if not post_url:
+        logger.info("POST_URL not set, skipping posting JSON result")
+        return None
+    try:
+        response = get_http_client().post(post_url, json=data)
+        response.raise_for_status()
+        logger.info(f"Posted JSON result to {post_url}")
+        return response.json()
+    except Exception as e:
+        logger.error(f"Failed to post JSON result: {e}")
+        return None
+
+
+class DeliveryQueue:
+    """Posts results to ``url`` from a background thread.
+
+    Results are batched, retried with jittered exponential backoff, and
+    appended to an NDJSON journal when the sink stays down or the queue is
+    full. The journal is replayed after the next successful delivery and
+    when the queue starts; a replay first renames it aside, so spills never
+    wait on a slow sink.
+    """
+
+    def __init__(self, url: str, journal_path: Path, batch_size: int = BATCH_SIZE):
+        self.url = url
+        self.journal_path = Path(journal_path)
+        self.claimed_path = self.journal_path.with_name(
+            self.journal_path.name + ".replaying"
+        )
+        self.batch_size = max(1, batch_size)
+        self.delivered = 0
+        self.spilled = 0
+        self.replayed = 0
+        self.last_error: Optional[str] = None
+        self.last_delivery: Optional[float] = None
+        self._queue: "queue.Queue[Tuple[float, Any]]" = queue.Queue(MAX_QUEUE)
+        self._oldest: Optional[float] = None
+        self._in_flight = 0
+        self._ids = 0
+        self._journal_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(
+            target=self._run, name="json-delivery", daemon=True
+        )
+        self._thread.start()
+
+    def enqueue(self, data: Any) -> Dict[str, Any]:
+        """Queue ``data`` for delivery and return a receipt immediately."""
+        with self._lock:
+            self._ids += 1
+            receipt = {"queued": True, "id": self._ids}
+        item = (time.time(), data)
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self._spill([item])
+            receipt["spilled"] = True
+        return receipt
+
+    def _take_batch(self) -> List[Tuple[float, Any]]:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + FLUSH_INTERVAL
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        self._safe_replay()
+        while True:
+            batch = self._take_batch()
+            self._oldest, self._in_flight = batch[0][0], len(batch)
+            try:
+                delivered = self._deliver([data for _, data in batch])
+            except Exception as e:
+                logger.error(f"Delivery worker error: {e}")
+                delivered = False
+            try:
+                if delivered:
+                    self._safe_replay()
+                else:
+                    self._spill(batch)
+            finally:
+                self._oldest, self._in_flight = None, 0
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _safe_replay(self) -> None:
+        try:
+            self._replay_journal()
+        except Exception as e:
+            logger.error(f"Journal replay failed: {e}")
+
+    def _post(self, payload: Any) -> None:
+        response = get_http_client().post(self.url, json=payload)
+        response.raise_for_status()
+
+    def _deliver(self, items: List[Any]) -> bool:
+        payload = items[0] if self.batch_size == 1 else items
+        for attempt in range(MAX_RETRIES + 1):
+            try:
+                self._post(payload)
+                self.delivered += len(items)
+                self.last_delivery = time.time()
+                self.last_error = None
+                return True
+            except Exception as e:
+                self.last_error = str(e)
+                if attempt == MAX_RETRIES:
+                    break
+                delay = min(BACKOFF_MAX, BACKOFF_BASE * 2**attempt)
+                time.sleep(random.uniform(0, delay))
+        logger.error(f"Delivery of {len(items)} result(s) failed: {self.last_error}")
+        return False
+
+    def _spill(self, batch: List[Tuple[float, Any]]) -> None:
+        lines = "".join(
+            json.dumps([queued_at, data], default=str) + "\n"
+            for queued_at, data in batch
+        )
+        with self._journal_lock:
+            try:
+                self.journal_path.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.journal_path, "ab+") as f:
+                    # Start on a fresh line after a partial one left by a crash.
+                    if f.seek(0, os.SEEK_END):
+                        f.seek(-1, os.SEEK_END)
+                        if f.read(1) != b"\n":
+                            lines = "\n" + lines
+                    f.write(lines.encode("utf-8"))
+                self.spilled += len(batch)
+            except OSError as e:
+                logger.error(f"Could not journal {len(batch)} result(s): {e}")
+
+    def _read_journal(self, path: Path) -> List[Tuple[float, Any]]:
+        entries = []
+        with open(path, "r", encoding="utf-8") as f:
+            for number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    queued_at, data = json.loads(line)
+                except ValueError:
+                    # A spill interrupted by a crash leaves a partial line.
+                    logger.warning(f"Skipping unreadable journal line {number}")
+                    continue
+                entries.append((queued_at, data))
+        return entries
+
+    def _replay_journal(self) -> None:
+        """Deliver journaled results, re-journaling whatever still fails.
+
+        The journal is renamed aside under the lock and delivered without
+        it. A claimed file left behind by a crash is replayed first.
+        """
+        with self._journal_lock:
+            if not self.claimed_path.exists():
+                if not self.journal_path.exists():
+                    return
+                os.replace(self.journal_path, self.claimed_path)
+        entries = self._read_journal(self.claimed_path)
+        pending = entries
+        while pending:
+            batch = pending[: self.batch_size]
+            if not self._deliver([data for _, data in batch]):
+                break
+            self.replayed += len(batch)
+            pending = pending[self.batch_size :]
+        if pending:
+            self._spill(pending)
+            self.spilled -= len(pending)
+        self.claimed_path.unlink()
+        if len(pending) < len(entries):
+            replayed = len(entries) - len(pending)
+            logger.info(f"Replayed {replayed} journaled result(s)")
+
+    def journal_size(self) -> int:
+        size = 0
+        for path in (self.journal_path, self.claimed_path):
+            try:
+                with open(path, "rb") as f:
+                    size += sum(1 for _ in f)
+            except OSError:
+                pass
+        return size
+
+    def flush(self, timeout: float = FLUSH_TIMEOUT) -> bool:
+        """Wait up to ``timeout`` seconds for queued results to be handled."""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.05)
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        oldest = self._oldest
+        if oldest is None and self._queue.qsize():
+            try:
+                oldest = self._queue.queue[0][0]
+            except IndexError:
+                oldest = None
+        return {
+            "url": self.url,
+            "depth": self._queue.qsize() + self._in_flight,
+            "lag_seconds": round(time.time() - oldest, 3) if oldest else 0.0,
+            "delivered": self.delivered,
+            "spilled": self.spilled,
+            "replayed": self.replayed,
+            "journal": self.journal_size(),
+            "last_error": self.last_error,
+            "last_delivery": self.last_delivery,
+        }
+
+
+_delivery: Optional[DeliveryQueue] = None
+_delivery_lock = threading.Lock()
+
+
+def get_delivery_queue() -> Optional[DeliveryQueue]:
+    """Process-wide DeliveryQueue for POST_URL, or None when it is not set."""
+    global _delivery
+    post_url = os.getenv("POST_URL")
+    if not post_url:
+        return None
+    if _delivery is None:
+        with _delivery_lock:
+            if _delivery is None:
+                _delivery = DeliveryQueue(
+                    post_url, get_cache_folder() / "delivery_journal.ndjson"
+                )
+                atexit.register(_delivery.flush)
+    return _delivery
+
+
+def enqueue_json_result(data) -> Optional[Dict[str, Any]]:
+    """Queue ``data`` for background posting to POST_URL.
+
+    Returns a receipt without waiting on the sink, or None when POST_URL is
+    not set.
+    """
+    delivery = get_delivery_queue()
+    if delivery is None:
+        logger.info("POST_URL not set, skipping posting JSON result")
+        return None
+    return delivery.enqueue(data)
+
+
+def delivery_stats() -> Optional[Dict[str, Any]]:
+    return _delivery.stats() if _delivery is not None else None
@@ -48,10 +48,14 @@ def create_categorization_result(
     ai_based: Optional[Dict] = None,
     raw_context: Optional[Dict[str, Any]] = None,
     market_analysis: Optional[Dict] = None,
+    context_version: Optional[str] = None,
+    reference: Optional[Dict] = None,
 ) -> Dict:
     return {
         "rule_based": rule_based,
         "ai_based": ai_based,
         "raw_context": raw_context,
+        "context_version": context_version,
+        "reference": reference,
         "market_analysis": market_analysis,
     }
@@ -0,0 +1,220 @@
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Any, Dict, Optional, Set, Union
+
+from config import get_cache_folder
+
+logger = logging.getLogger(__name__)
+
+# Minimum trigram Dice similarity for a name to be suggested. Suggestions
+# are never treated as the same company.
+MATCH_THRESHOLD = float(os.getenv("NAME_MATCH_THRESHOLD", "0.85"))
+
+LEGAL_SUFFIXES = {
+    "ab", "ag", "as", "bv", "co", "company", "corp", "corporation", "gmbh",
+    "group", "holdings", "inc", "incorporated", "limited", "llc", "llp", "ltd",
+    "nv", "oyj", "plc", "pte", "pvt", "sa", "sas", "se", "spa",
+}
+
+
+def normalize_name(name: Any) -> str:
+    """Lower-case, accent- and punctuation-free name without legal suffixes."""
+    text = unicodedata.normalize("NFKD", str(name))
+    text = "".join(c for c in text if not unicodedata.combining(c)).casefold()
+    text = text.replace(".", "").replace("&", " and ")
+    tokens = re.sub(r"[^\w\s]", " ", text).split()
+    while len(tokens) > 1 and tokens[-1] in LEGAL_SUFFIXES:
+        tokens.pop()
+    return " ".join(tokens)
+
+
+def trigrams(key: str) -> Set[str]:
+    padded = f"  {key} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+class NameResolver:
+    """Maps company-name variants to one canonical entity.
+
+    Only exact normalized keys (a name or a known alias) resolve to an
+    entity. Other names can be matched against a trigram index of known
+    keys by Dice similarity, but only as suggestions: near-identical names
+    such as "State Bank of Indiana" and "State Bank of India" are different
+    companies. Known keys come from the data/ reference index plus names
+    learned from earlier remote lookups, which are persisted in SQLite.
+    """
+
+    def __init__(
+        self,
+        path: Optional[Union[str, Path]] = None,
+        threshold: float = MATCH_THRESHOLD,
+        seed_reference: bool = True,
+    ):
+        self.threshold = threshold
+        self.exact_hits = 0
+        self.suggestions = 0
+        self.misses = 0
+        self._canonical: Dict[str, str] = {}
+        self._postings: Dict[str, Set[str]] = defaultdict(set)
+        self._sizes: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._conn = None
+        if seed_reference:
+            self.seed_reference()
+        if path:
+            self._open_store(Path(path))
+
+    def seed_reference(self) -> None:
+        """Add the names of the data/ reference index; known keys are kept."""
+        from reference_index import get_company_index
+
+        try:
+            names = list(get_company_index().names())
+            with self._lock:
+                for alias, canonical in names:
+                    self._add(normalize_name(alias), canonical)
+        except Exception as e:
+            logger.warning(f"Name index not seeded from reference data: {e}")
+
+    def _open_store(self, path: Path) -> None:
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(path), check_same_thread=False)
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS aliases (
+                    key TEXT PRIMARY KEY,
+                    canonical TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )"""
+            )
+            self._conn.commit()
+            for key, canonical in self._conn.execute(
+                "SELECT key, canonical FROM aliases"
+            ):
+                self._add(key, canonical)
+        except sqlite3.Error as e:
+            logger.warning(f"Learned name aliases unavailable: {e}")
+            self._conn = None
+
+    def _add(self, key: str, canonical: str) -> bool:
+        if not key or key in self._canonical:
+            return False
+        self._canonical[key] = canonical
+        grams = trigrams(key)
+        self._sizes[key] = len(grams)
+        for gram in grams:
+            self._postings[gram].add(key)
+        return True
+
+    def _fuzzy(self, key: str) -> Optional[Dict[str, Any]]:
+        grams = trigrams(key)
+        shared = Counter()
+        for gram in grams:
+            shared.update(self._postings.get(gram, ()))
+        best, best_score = None, 0.0
+        for candidate, count in shared.items():
+            score = 2.0 * count / (len(grams) + self._sizes[candidate])
+            if score > best_score:
+                best, best_score = candidate, score
+        if best is None or best_score < self.threshold:
+            return None
+        return {"key": best, "canonical": self._canonical[best], "score": best_score}
+
+    def resolve(self, name: str) -> Optional[Dict[str, Any]]:
+        """``{"key", "canonical", "score", "match"}`` when the normalized
+        name is a known name or alias, else None."""
+        key = normalize_name(name)
+        if not key:
+            return None
+        with self._lock:
+            canonical = self._canonical.get(key)
+            if canonical is None:
+                self.misses += 1
+                return None
+            self.exact_hits += 1
+            return {"key": key, "canonical": canonical, "score": 1.0, "match": "exact"}
+
+    def suggest(self, name: str) -> Optional[Dict[str, Any]]:
+        """Closest known name to an unknown ``name`` (``match`` is
+        "suggestion"), or None. Only for display, never as an identity."""
+        key = normalize_name(name)
+        if not key:
+            return None
+        with self._lock:
+            if key in self._canonical:
+                return None
+            match = self._fuzzy(key)
+            if match is None:
+                return None
+            self.suggestions += 1
+            return dict(match, match="suggestion")
+
+    def canonical_key(self, name: str) -> str:
+        """Cache key shared by the spellings and known aliases of a company;
+        similar but unknown names keep their own key."""
+        match = self.resolve(name)
+        return normalize_name(match["canonical"]) if match else normalize_name(name)
+
+    def canonical_name(self, name: str) -> str:
+        """Display name to send to remote lookups (the input if unknown)."""
+        match = self.resolve(name)
+        return match["canonical"] if match else " ".join(str(name).split())
+
+    def learn(self, alias: str, canonical: Optional[str] = None) -> None:
+        """Record ``alias`` (as its own canonical entity unless one is given)
+        so later near-duplicates resolve to it locally."""
+        key = normalize_name(alias)
+        canonical = canonical or " ".join(str(alias).split())
+        with self._lock:
+            if not self._add(key, canonical) or self._conn is None:
+                return
+            try:
+                self._conn.execute(
+                    "INSERT OR IGNORE INTO aliases (key, canonical, created_at) "
+                    "VALUES (?, ?, ?)",
+                    (key, canonical, time.time()),
+                )
+                self._conn.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"Could not persist alias {key!r}: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "names": len(self._canonical),
+            "exact_hits": self.exact_hits,
+            "suggestions": self.suggestions,
+            "misses": self.misses,
+        }
+
+
+_resolver: Optional[NameResolver] = None
+_resolver_lock = threading.Lock()
+
+
+def get_name_resolver() -> NameResolver:
+    """Return the process-wide NameResolver, seeding it on first use."""
+    global _resolver
+    if _resolver is None:
+        with _resolver_lock:
+            if _resolver is None:
+                _resolver = NameResolver(get_cache_folder() / "name_aliases.sqlite")
+    return _resolver
+
+
+def name_key(name: str) -> str:
+    return get_name_resolver().canonical_key(name)
+
+
+def canonical_name(name: str) -> str:
+    return get_name_resolver().canonical_name(name)
+
+
+def learn_name(alias: str, canonical: Optional[str] = None) -> None:
+    get_name_resolver().learn(alias, canonical)
@@ -0,0 +1,123 @@
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# Columns of get_bulk_financials output used by the comparison.
+METRIC_COLUMNS = {
+    "market_cap": "market_data.Market Cap",
+    "price": "market_data.Current Price",
+    "volume": "market_data.Volume",
+    "pe_ratio": "financial_metrics.PE Ratio",
+    "price_to_book": "financial_metrics.Price to Book",
+    "price_to_sales": "financial_metrics.Price to Sales",
+    "beta": "financial_metrics.Beta",
+    "revenue": "income_statement.Revenue",
+    "revenue_growth": "income_statement.Revenue Growth",
+    "ebitda": "income_statement.EBITDA",
+    "net_income": "income_statement.Net Income",
+    "profit_margin": "income_statement.Profit Margin",
+    "total_cash": "balance_sheet.Total Cash",
+    "total_debt": "balance_sheet.Total Debt",
+}
+REQUIRED_SECTIONS = sorted(
+    {column.split(".")[0] for column in METRIC_COLUMNS.values()}
+)
+# Metrics ranked and standardized across the peer set.
+SCORED_METRICS = [
+    "market_cap",
+    "revenue",
+    "revenue_growth",
+    "profit_margin",
+    "pe_ratio",
+    "ev_to_revenue",
+    "ev_to_ebitda",
+]
+
+
+def to_numeric(values: Iterable) -> np.ndarray:
+    """Coerce mixed values ("N/A", None, numeric strings) to float64 with NaN."""
+    series = pd.Series(list(values), dtype=object)
+    return pd.to_numeric(series, errors="coerce").to_numpy(dtype=np.float64)
+
+
+def nansum(values: Iterable) -> float:
+    """Sum of the numeric entries in ``values``, ignoring anything else."""
+    return float(np.nansum(to_numeric(values)))
+
+
+def financials_frame(bulk: Dict) -> pd.DataFrame:
+    """Typed float64 frame (one row per ticker) from get_bulk_financials output."""
+    columns = bulk.get("columns", {})
+    return pd.DataFrame(
+        {
+            name: to_numeric(columns.get(source, [None] * len(bulk["tickers"])))
+            for name, source in METRIC_COLUMNS.items()
+        },
+        index=pd.Index(bulk["tickers"], name="ticker"),
+    )
+
+
+def _safe_divide(numerator: pd.Series, denominator: pd.Series) -> pd.Series:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = numerator / denominator
+    return ratio.replace([np.inf, -np.inf], np.nan)
+
+
+def compare_peers(frame: pd.DataFrame) -> pd.DataFrame:
+    """Add market share, valuation multiples, percentile ranks and z-scores.
+
+    All columns are computed column-wise over the whole peer set; missing
+    values stay NaN and are excluded from totals, ranks and moments.
+    """
+    result = frame.copy()
+    total_cap = np.nansum(result["market_cap"].to_numpy())
+    result["market_share"] = (
+        result["market_cap"] / total_cap if total_cap > 0 else np.nan
+    )
+
+    enterprise_value = (
+        result["market_cap"]
+        + result["total_debt"].fillna(0)
+        - result["total_cash"].fillna(0)
+    )
+    result["enterprise_value"] = enterprise_value
+    result["ev_to_revenue"] = _safe_divide(enterprise_value, result["revenue"])
+    result["ev_to_ebitda"] = _safe_divide(enterprise_value, result["ebitda"])
+    result["earnings_yield"] = _safe_divide(result["net_income"], result["market_cap"])
+
+    scored = result[SCORED_METRICS]
+    percentiles = scored.rank(pct=True).add_suffix("_percentile")
+    std = scored.std(ddof=0).replace(0, np.nan)
+    zscores = ((scored - scored.mean()) / std).add_suffix("_zscore")
+    return pd.concat([result, percentiles, zscores], axis=1)
+
+
+def frame_to_records(frame: pd.DataFrame) -> List[Dict]:
+    """JSON-friendly rows with NaN turned into None."""
+    clean = frame.astype(object).where(frame.notna(), None)
+    return clean.reset_index().to_dict(orient="records")
+
+
+def peer_comparison(
+    ticker: str, peers: Iterable[str], sections: Optional[List[str]] = None
+) -> Dict:
+    """Fetch financials for ``ticker`` and its peers and compare them."""
+    from services import get_bulk_financials
+
+    tickers = [ticker] + [peer for peer in peers if peer]
+    bulk = get_bulk_financials(tickers, sections=sections or REQUIRED_SECTIONS)
+    comparison = compare_peers(financials_frame(bulk))
+    company = ticker.strip().upper()
+    return {
+        "ticker": company,
+        "company": (
+            frame_to_records(comparison.loc[[company]])[0]
+            if company in comparison.index
+            else None
+        ),
+        "peers": frame_to_records(comparison.drop(index=company, errors="ignore")),
+        "errors": bulk["errors"],
+        "rate_limited": bulk["rate_limited"],
+        "retry_after": bulk["retry_after"],
+    }
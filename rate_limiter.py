@@ -0,0 +1,240 @@
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+from functools import wraps
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+# Requests per minute for each upstream; override with RATE_LIMIT_<NAME>.
+DEFAULT_LIMITS = {
+    "yahoo_search": 50,
+    "yfinance": 50,
+    "wikidata": 60,
+    "gemini": int(os.getenv("REQUESTS_PER_MINUTE", "60")),
+}
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a token could not be acquired within the allowed wait."""
+
+
+class SQLiteBucketStore:
+    """Keeps bucket state in a SQLite file so several processes share a budget."""
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS buckets (
+                    name TEXT PRIMARY KEY,
+                    tokens REAL NOT NULL,
+                    updated REAL NOT NULL
+                )"""
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(str(self.path), timeout=10, isolation_level=None)
+
+    def take(self, name: str, tokens: float, rate: float, capacity: float) -> float:
+        """Take ``tokens`` if available; otherwise return seconds to wait."""
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT tokens, updated FROM buckets WHERE name = ?", (name,)
+            ).fetchone()
+            now = time.time()
+            available, updated = row if row else (capacity, now)
+            available = min(capacity, available + (now - updated) * rate)
+            wait = 0.0
+            if available >= tokens:
+                available -= tokens
+            else:
+                wait = (tokens - available) / rate
+            conn.execute(
+                "INSERT OR REPLACE INTO buckets (name, tokens, updated) VALUES (?, ?, ?)",
+                (name, available, now),
+            )
+            conn.execute("COMMIT")
+            return wait
+        finally:
+            conn.close()
+
+
+class TokenBucket:
+    """Thread-safe token bucket with blocking and asyncio acquire.
+
+    State lives in memory unless a SQLiteBucketStore is given, in which case
+    every process using the same store file shares one budget.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        rate_per_minute: float,
+        capacity: Optional[float] = None,
+        max_wait: Optional[float] = 5.0,
+        store: Optional[SQLiteBucketStore] = None,
+    ):
+        """
+        Args:
+            name: Upstream name, used as the shared-store key and in metrics.
+            rate_per_minute: Sustained request rate.
+            capacity: Burst size; defaults to one minute of requests.
+            max_wait: Longest a caller waits for a token before
+                RateLimitExceeded; None waits indefinitely.
+            store: Optional cross-process store.
+        """
+        self.name = name
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else float(rate_per_minute)
+        self.max_wait = max_wait
+        self.store = store
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+        self.acquired = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+        self.max_observed_wait = 0.0
+
+    def _take(self, tokens: float) -> float:
+        if self.store is not None:
+            return self.store.take(self.name, tokens, self.rate, self.capacity)
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.capacity, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self.rate
+
+    def _record(self, waited: float, ok: bool) -> None:
+        with self._lock:
+            if ok:
+                self.acquired += 1
+                self.total_wait += waited
+                self.max_observed_wait = max(self.max_observed_wait, waited)
+            else:
+                self.rejected += 1
+
+    def _next_sleep(self, wait: float, started: float) -> Optional[float]:
+        if self.max_wait is None:
+            return wait
+        remaining = self.max_wait - (time.monotonic() - started)
+        if wait > remaining:
+            return None
+        return wait
+
+    def acquire(self, tokens: float = 1) -> None:
+        """Block until ``tokens`` are available or raise RateLimitExceeded."""
+        started = time.monotonic()
+        while True:
+            wait = self._take(tokens)
+            if wait <= 0:
+                self._record(time.monotonic() - started, True)
+                return
+            sleep_for = self._next_sleep(wait, started)
+            if sleep_for is None:
+                self._record(0.0, False)
+                raise RateLimitExceeded(f"Rate limit exceeded for {self.name}")
+            time.sleep(sleep_for)
+
+    async def acquire_async(self, tokens: float = 1) -> None:
+        """Like acquire, but yields to the event loop while waiting."""
+        started = time.monotonic()
+        while True:
+            wait = self._take(tokens)
+            if wait <= 0:
+                self._record(time.monotonic() - started, True)
+                return
+            sleep_for = self._next_sleep(wait, started)
+            if sleep_for is None:
+                self._record(0.0, False)
+                raise RateLimitExceeded(f"Rate limit exceeded for {self.name}")
+            await asyncio.sleep(sleep_for)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "rate_per_minute": self.rate * 60.0,
+                "capacity": self.capacity,
+                "acquired": self.acquired,
+                "rejected": self.rejected,
+                "total_wait_seconds": round(self.total_wait, 3),
+                "avg_wait_seconds": round(self.total_wait / self.acquired, 3)
+                if self.acquired
+                else 0.0,
+                "max_wait_seconds": round(self.max_observed_wait, 3),
+                "shared": self.store is not None,
+            }
+
+
+_limiters: Dict[str, TokenBucket] = {}
+_registry_lock = threading.Lock()
+_store: Optional[SQLiteBucketStore] = None
+
+
+def _shared_store() -> Optional[SQLiteBucketStore]:
+    global _store
+    store_path = os.getenv("RATE_LIMIT_STORE")
+    if store_path and _store is None:
+        try:
+            _store = SQLiteBucketStore(store_path)
+        except Exception as e:
+            logger.warning(f"Shared rate limit store unavailable: {e}")
+    return _store
+
+
+def get_limiter(name: str) -> TokenBucket:
+    """Return the process-wide limiter for an upstream, creating it on first use."""
+    with _registry_lock:
+        limiter = _limiters.get(name)
+        if limiter is None:
+            rate = float(
+                os.getenv(f"RATE_LIMIT_{name.upper()}", DEFAULT_LIMITS.get(name, 60))
+            )
+            max_wait = float(os.getenv("RATE_LIMIT_MAX_WAIT", "5"))
+            limiter = TokenBucket(
+                name, rate, max_wait=max_wait, store=_shared_store()
+            )
+            _limiters[name] = limiter
+        return limiter
+
+
+def rate_limited(name: str):
+    """Decorator acquiring one token from the named limiter per call."""
+
+    def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                await get_limiter(name).acquire_async()
+                return await func(*args, **kwargs)
+
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            get_limiter(name).acquire()
+            return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def limiter_stats() -> Dict[str, Dict[str, float]]:
+    with _registry_lock:
+        return {name: limiter.stats() for name, limiter in _limiters.items()}
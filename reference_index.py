@@ -0,0 +1,480 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+
+from config import get_cache_folder, get_data_folder
+from name_resolution import get_name_resolver, normalize_name
+from snapshot import current_build, publish_build, read_table
+
+logger = logging.getLogger(__name__)
+
+# Bump when the index layout or normalization changes.
+FORMAT_VERSION = 3
+MAX_PEERS = int(os.getenv("REFERENCE_MAX_PEERS", "10"))
+# Seconds between checks of data/ for changed datasets.
+CHECK_INTERVAL = float(os.getenv("REFERENCE_CHECK_INTERVAL", "5"))
+
+# Columns read from each dataset in data/; missing columns are ignored.
+DATASETS = {
+    "Multinational_Companies.xlsx": {
+        "name": ["Company Name"],
+        "aliases": ["Trade name", "Native name", "Formerly"],
+        "location": ["Headquarters"],
+        "industry": ["Industry"],
+        "traded_as": ["Traded as"],
+    },
+    "current_unicron_detailed.xlsx": {
+        "name": ["Company Name (Main Table)"],
+        "aliases": ["Company Name (Infobox)", "Trade name", "Native name", "Formerly"],
+        "location": ["Headquarters"],
+        "industry": ["Industry"],
+        "traded_as": ["Traded as"],
+    },
+    "current_unicron_overview.xlsx": {
+        "name": ["Company"],
+        "location": ["Country/countries"],
+        "industry": ["Industry"],
+    },
+    "former_unicrons_detailed.xlsx": {
+        "name": ["Company Name (Main Table)"],
+        "aliases": ["Company Name (Infobox)", "Trade name", "Native name", "Formerly"],
+        "location": ["Headquarters"],
+        "industry": ["Industry"],
+        "traded_as": ["Traded as"],
+    },
+    "former_unicrons_overview.xlsx": {
+        "name": ["Company"],
+        "location": ["Country"],
+    },
+    "indian_companies.csv": {
+        "name": ["Name"],
+        "location": ["Location"],
+        "industry": ["Industry"],
+    },
+    "indian_companies.xlsx": {
+        "name": ["Company Name"],
+        "aliases": ["Trade name", "Native name", "Formerly"],
+        "location": ["Headquarters"],
+        "industry": ["Industry"],
+        "traded_as": ["Traded as"],
+    },
+}
+
+# Exchange prefixes in "Traded as" cells mapped to Yahoo Finance suffixes.
+EXCHANGE_SUFFIXES = {
+    "NYSE": "",
+    "NASDAQ": "",
+    "NSE": ".NS",
+    "BSE": ".BO",
+    "LSE": ".L",
+    "SEHK": ".HK",
+    "TSX": ".TO",
+    "ASX": ".AX",
+}
+_TICKER_RE = re.compile(
+    r"\b(" + "|".join(EXCHANGE_SUFFIXES) + r")\s*:\s*([A-Z0-9][A-Z0-9.\-]*)",
+    re.IGNORECASE,
+)
+_CITATION_RE = re.compile(r"\[\s*\d+\s*\]")
+_PARENS_RE = re.compile(r"\([^)]*\)")
+
+
+def _key_hash(key: str) -> int:
+    return int.from_bytes(
+        hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little"
+    )
+
+
+def _clean_text(value: Any) -> Optional[str]:
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return None
+    text = _CITATION_RE.sub("", str(value)).replace("\xa0", " ")
+    text = re.sub(r"\s+,", ",", re.sub(r"\s+", " ", text)).strip(" ,")
+    return text or None
+
+
+def _split_aliases(value: str) -> List[str]:
+    # "Formerly" cells list several names, each followed by "(years)".
+    return [part.strip(" ,;") for part in _PARENS_RE.split(value) if part.strip(" ,;")]
+
+
+def _parse_ticker(value: str) -> Optional[str]:
+    match = _TICKER_RE.search(value)
+    if not match:
+        return None
+    exchange, symbol = match.group(1).upper(), match.group(2).upper().rstrip(".")
+    if exchange == "SEHK" and symbol.isdigit():
+        symbol = symbol.zfill(4)
+    return symbol + EXCHANGE_SUFFIXES[exchange]
+
+
+def _first(row: Dict[str, Any], columns: Iterable[str]) -> Optional[str]:
+    for column in columns:
+        value = _clean_text(row.get(column))
+        if value:
+            return value
+    return None
+
+
+class _Builder:
+    """Merges dataset rows into company records keyed by normalized names."""
+
+    def __init__(self):
+        self.records: List[Dict[str, Any]] = []
+        self.keys: Dict[str, int] = {}
+
+    def add(self, source: str, row: Dict[str, Any], spec: Dict[str, List[str]]):
+        name = _first(row, spec["name"])
+        if not name:
+            return
+        aliases = []
+        for column in spec.get("aliases", []):
+            value = _clean_text(row.get(column))
+            if value:
+                if column == "Formerly":
+                    aliases.extend(_split_aliases(value))
+                else:
+                    aliases.append(value)
+
+        keys = [normalize_name(n) for n in [name, *aliases]]
+        record_id = next((self.keys[k] for k in keys if k in self.keys), None)
+        if record_id is None:
+            record_id = len(self.records)
+            self.records.append(
+                {
+                    "name": name,
+                    "aliases": [],
+                    "location": None,
+                    "industry": [],
+                    "ticker": None,
+                    "sources": [],
+                }
+            )
+        record = self.records[record_id]
+        for alias in [name, *aliases]:
+            if alias != record["name"] and alias not in record["aliases"]:
+                record["aliases"].append(alias)
+        record["location"] = record["location"] or _first(row, spec.get("location", []))
+        industry = _first(row, spec.get("industry", []))
+        if industry and industry not in record["industry"]:
+            record["industry"].append(industry)
+        traded_as = _first(row, spec.get("traded_as", []))
+        if traded_as and not record["ticker"]:
+            record["ticker"] = _parse_ticker(traded_as)
+        if source not in record["sources"]:
+            record["sources"].append(source)
+        for key in keys:
+            if key:
+                self.keys.setdefault(key, record_id)
+
+
+def _industry_key(record: Dict[str, Any]) -> Optional[str]:
+    if not record["industry"]:
+        return None
+    return normalize_name(record["industry"][0].split(",")[0]) or None
+
+
+def _dataset_files(data_folder: Path) -> Dict[str, Path]:
+    return {
+        name: data_folder / name
+        for name in DATASETS
+        if (data_folder / name).is_file()
+    }
+
+
+def _signatures(files: Dict[str, Path]) -> Dict[str, List[int]]:
+    signatures = {}
+    for name, path in files.items():
+        stat = path.stat()
+        signatures[name] = [stat.st_mtime_ns, stat.st_size]
+    return signatures
+
+
+def build_index(data_folder: Path, root: Path) -> Path:
+    """Compile the datasets in ``data_folder`` into a new build directory
+    under ``root`` and return it.
+
+    Layout: sorted uint64 hashes of every normalized name/alias with the
+    record each points to, one JSON document per record in a shared UTF-8
+    buffer, and an industry id per record for peer lookups. All arrays are
+    plain ``.npy`` files opened with mmap.
+
+    Each build gets its own directory and root/CURRENT is switched to it
+    atomically once complete, so builds already memory-mapped by this or
+    another process are never overwritten.
+    """
+    files = _dataset_files(data_folder)
+    signatures = _signatures(files)
+    builder = _Builder()
+    for name, path in files.items():
+        spec = DATASETS[name]
+        try:
+            df = read_table(path)
+        except Exception as e:
+            logger.error(f"Skipping {name} in reference index: {e}")
+            continue
+        wanted = [c for columns in spec.values() for c in columns if c in df.columns]
+        for row in df[wanted].to_dict(orient="records"):
+            builder.add(name, row, spec)
+
+    industries: Dict[str, int] = {}
+    industry_ids = np.full(len(builder.records), -1, dtype=np.int32)
+    for record_id, record in enumerate(builder.records):
+        key = _industry_key(record)
+        if key:
+            industry_ids[record_id] = industries.setdefault(key, len(industries))
+
+    items = sorted((_key_hash(key), rid) for key, rid in builder.keys.items())
+    encoded = [json.dumps(record).encode("utf-8") for record in builder.records]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(item) for item in encoded], out=offsets[1:])
+
+    if (root / "meta.json").is_file():
+        # Format 2 kept its one build directly in root.
+        for path in [root / "meta.json", *root.glob("*.npy")]:
+            try:
+                path.unlink()
+            except OSError as e:
+                logger.warning(f"Could not remove old index file {path}: {e}")
+    root.mkdir(parents=True, exist_ok=True)
+    staging = Path(tempfile.mkdtemp(dir=root, prefix="build-"))
+    try:
+        hashes = np.array([h for h, _ in items], dtype=np.uint64)
+        key_records = np.array([r for _, r in items], dtype=np.int32)
+        blob = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        np.save(staging / "keys.npy", hashes)
+        np.save(staging / "key_records.npy", key_records)
+        np.save(staging / "records.data.npy", blob)
+        np.save(staging / "records.offsets.npy", offsets)
+        np.save(staging / "industry_ids.npy", industry_ids)
+        meta = {
+            "format": FORMAT_VERSION,
+            "data_folder": str(data_folder.resolve()),
+            "signatures": signatures,
+            "records": len(builder.records),
+            "keys": len(items),
+            "industries": list(industries),
+        }
+        (staging / "meta.json").write_text(json.dumps(meta), encoding="utf-8")
+        publish_build(root, staging)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    logger.info(
+        f"Built reference index: {len(builder.records)} companies, {len(items)} names"
+    )
+    return staging
+
+
+class CompanyIndex:
+    """Memory-mapped lookup of known companies by name or alias.
+
+    The index is compiled from data/ on first use, reusing the current
+    build under ``directory`` while the datasets are unchanged. Lookups
+    hash the normalized name and binary search the sorted hash array,
+    decoding only the matching record.
+    """
+
+    def __init__(
+        self,
+        data_folder: Optional[Union[str, Path]] = None,
+        directory: Optional[Union[str, Path]] = None,
+    ):
+        self.data_folder = Path(data_folder or get_data_folder())
+        self.directory = Path(directory or get_cache_folder() / "reference_index")
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._load()
+
+    def _fresh_meta(self) -> Optional[Tuple[Dict[str, Any], Path]]:
+        """Metadata and directory of the current build, if it matches the
+        datasets in data/."""
+        build = current_build(self.directory)
+        if build is None:
+            return None
+        try:
+            meta = json.loads((build / "meta.json").read_text("utf-8"))
+        except (OSError, ValueError):
+            return None
+        if meta.get("format") != FORMAT_VERSION:
+            return None
+        if meta.get("signatures") != _signatures(_dataset_files(self.data_folder)):
+            return None
+        return meta, build
+
+    def _load(self) -> None:
+        with self._lock:
+            fresh = self._fresh_meta()
+            if fresh is None:
+                build = build_index(self.data_folder, self.directory)
+                fresh = json.loads((build / "meta.json").read_text("utf-8")), build
+            self.meta, self.build = fresh
+            self._keys = self._array("keys")
+            self._key_records = self._array("key_records")
+            self._data = self._array("records.data")
+            self._offsets = self._array("records.offsets")
+            self._industry_ids = self._array("industry_ids")
+
+    def _array(self, name: str) -> np.ndarray:
+        return np.load(self.build / f"{name}.npy", mmap_mode="r")
+
+    def is_stale(self) -> bool:
+        """Whether a dataset changed, or another process published a new
+        build, since the index was loaded."""
+        fresh = self._fresh_meta()
+        return fresh is None or fresh[1] != self.build
+
+    def __len__(self) -> int:
+        return len(self._industry_ids)
+
+    def _record(self, record_id: int) -> Dict[str, Any]:
+        start, end = int(self._offsets[record_id]), int(self._offsets[record_id + 1])
+        return json.loads(self._data[start:end].tobytes().decode("utf-8"))
+
+    def _find(self, key: str) -> Optional[int]:
+        if not key:
+            return None
+        target = np.uint64(_key_hash(key))
+        position = int(np.searchsorted(self._keys, target))
+        while position < len(self._keys) and self._keys[position] == target:
+            record_id = int(self._key_records[position])
+            record = self._record(record_id)
+            # Guard against hash collisions.
+            if key in {normalize_name(n) for n in [record["name"], *record["aliases"]]}:
+                return record_id
+            position += 1
+        return None
+
+    def lookup(self, company_name: str) -> Optional[Dict[str, Any]]:
+        """Record for ``company_name`` (name or alias), with its peers."""
+        record_id = self._find(normalize_name(company_name))
+        if record_id is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        record = self._record(record_id)
+        record["peers"] = self._peers(record_id)
+        return record
+
+    def names(self) -> Iterator[Tuple[str, str]]:
+        """``(name or alias, canonical name)`` for every record."""
+        for record_id in range(len(self)):
+            record = self._record(record_id)
+            yield record["name"], record["name"]
+            for alias in record["aliases"]:
+                yield alias, record["name"]
+
+    def _peers(self, record_id: int, limit: int = MAX_PEERS) -> List[str]:
+        industry_id = self._industry_ids[record_id]
+        if industry_id < 0:
+            return []
+        matches = np.flatnonzero(np.asarray(self._industry_ids) == industry_id)
+        return [
+            self._record(int(i))["name"] for i in matches[: limit + 1] if i != record_id
+        ][:limit]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "companies": len(self),
+            "names": len(self._keys),
+        }
+
+
+_index: Optional[CompanyIndex] = None
+_index_lock = threading.Lock()
+_reload_lock = threading.Lock()
+_checked_at = 0.0
+
+
+def get_company_index() -> CompanyIndex:
+    """Return the process-wide CompanyIndex, building it on first use.
+
+    At most every CHECK_INTERVAL seconds a background thread checks data/
+    for changes and swaps in a rebuilt index; callers keep using the
+    current one meanwhile, and those holding it finish on it.
+    """
+    global _index, _checked_at
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = CompanyIndex()
+                _checked_at = time.monotonic()
+        return _index
+    if time.monotonic() - _checked_at >= CHECK_INTERVAL and _reload_lock.acquire(
+        blocking=False
+    ):
+        _checked_at = time.monotonic()
+        threading.Thread(
+            target=_reload_index, name="reference-index-reload", daemon=True
+        ).start()
+    return _index
+
+
+def _reload_index() -> None:
+    # Runs with _reload_lock held, so at most one check or rebuild at a time.
+    global _index
+    try:
+        previous = _index
+        if not previous.is_stale():
+            return
+        fresh = CompanyIndex(previous.data_folder, previous.directory)
+        fresh.hits, fresh.misses = previous.hits, previous.misses
+        _index = fresh
+        logger.info("Reference index reloaded after a dataset change")
+        get_name_resolver().seed_reference()
+    except Exception as e:
+        logger.error(f"Reference index reload failed: {e}")
+    finally:
+        _reload_lock.release()
+
+
+def index_stats() -> Optional[Dict[str, Any]]:
+    """Stats of the loaded index; None until the first lookup builds it."""
+    return _index.stats() if _index is not None else None
+
+
+def index_version() -> Optional[str]:
+    """Short hash of the datasets the index was built from, or None when the
+    index is unavailable."""
+    try:
+        meta = get_company_index().meta
+    except Exception as e:
+        logger.warning(f"Reference index unavailable: {e}")
+        return None
+    payload = json.dumps([meta.get("format"), meta.get("signatures")], sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def lookup_company(company_name: str) -> Optional[Dict[str, Any]]:
+    """Known-company record, or None when unknown or the index is unavailable.
+
+    Only exact normalized names and aliases match; see suggest_company for
+    near misses.
+    """
+    try:
+        return get_company_index().lookup(company_name)
+    except Exception as e:
+        logger.warning(f"Reference index unavailable: {e}")
+        return None
+
+
+def suggest_company(company_name: str) -> Optional[Dict[str, Any]]:
+    """``{"name", "score"}`` of the closest known company to an unknown
+    name, or None."""
+    match = get_name_resolver().suggest(company_name)
+    if match is None:
+        return None
+    return {"name": match["canonical"], "score": round(match["score"], 3)}
@@ -0,0 +1,187 @@
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Union
+
+logger = logging.getLogger(__name__)
+
+# SQLite's default limit on host parameters per statement is 999.
+MAX_KEYS_PER_QUERY = 500
+
+
+def normalize_key_text(text: str) -> str:
+    """Lower-case and collapse whitespace so trivial variants share a key."""
+    return " ".join(str(text).split()).lower()
+
+
+def make_cache_key(*parts: Any) -> str:
+    """Build a content-addressed key from arbitrary JSON-serializable parts."""
+    payload = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """SQLite-backed key/value cache with a TTL and an LRU entry limit."""
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        ttl_seconds: float = 7 * 24 * 3600,
+        max_entries: int = 10000,
+    ):
+        """
+        Args:
+            path: SQLite database file; parent directories are created.
+            ttl_seconds: Entries older than this are treated as misses.
+            max_entries: Least recently used entries beyond this are evicted.
+        """
+        self.path = Path(path)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )"""
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_entries_accessed ON entries(accessed_at)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.ttl_seconds:
+                if row is not None:
+                    self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                    self._conn.commit()
+                self.misses += 1
+                return None
+            self._conn.execute(
+                "UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+            self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def contains_many(self, keys: Iterable[str]) -> Set[str]:
+        """The ``keys`` that are present and fresh, without reading values.
+
+        Absent keys count as misses; hits are counted when values are read.
+        """
+        keys = list(dict.fromkeys(keys))
+        cutoff = time.time() - self.ttl_seconds
+        present: Set[str] = set()
+        with self._lock:
+            for start in range(0, len(keys), MAX_KEYS_PER_QUERY):
+                part = keys[start : start + MAX_KEYS_PER_QUERY]
+                present.update(
+                    key
+                    for (key,) in self._conn.execute(
+                        "SELECT key FROM entries WHERE created_at >= ? AND key IN "
+                        f"({', '.join('?' * len(part))})",
+                        [cutoff, *part],
+                    )
+                )
+            self.misses += len(keys) - len(present)
+        return present
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, str]:
+        """Values for the ``keys`` that are present and fresh, in one commit."""
+        keys = list(dict.fromkeys(keys))
+        now = time.time()
+        found: Dict[str, str] = {}
+        expired: List[str] = []
+        with self._lock:
+            for start in range(0, len(keys), MAX_KEYS_PER_QUERY):
+                part = keys[start : start + MAX_KEYS_PER_QUERY]
+                rows = self._conn.execute(
+                    "SELECT key, value, created_at FROM entries WHERE key IN "
+                    f"({', '.join('?' * len(part))})",
+                    part,
+                ).fetchall()
+                for key, value, created_at in rows:
+                    if now - created_at > self.ttl_seconds:
+                        expired.append(key)
+                    else:
+                        found[key] = value
+            self._conn.executemany(
+                "DELETE FROM entries WHERE key = ?", [(key,) for key in expired]
+            )
+            self._conn.executemany(
+                "UPDATE entries SET accessed_at = ? WHERE key = ?",
+                [(now, key) for key in found],
+            )
+            self._conn.commit()
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def set(self, key: str, value: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, created_at, accessed_at)"
+                " VALUES (?, ?, ?, ?)",
+                (key, value, now, now),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def set_many(self, items: Dict[str, str]) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO entries (key, value, created_at, accessed_at)"
+                " VALUES (?, ?, ?, ?)",
+                [(key, value, now, now) for key, value in items.items()],
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()
+        overflow = count - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM entries WHERE key IN ("
+                "SELECT key FROM entries ORDER BY accessed_at LIMIT ?)",
+                (overflow,),
+            )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM entries")
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            count, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(value)), 0) FROM entries"
+            ).fetchone()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": count,
+            "bytes": size,
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "path": str(self.path),
+        }
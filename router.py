@@ -1,12 +1,14 @@
 from flask import Blueprint, request, jsonify
-from datetime import datetime
+import asyncio
 import logging
 
 # Import helper functions from the new services module
-from services import get_ticker_from_name, get_company_financials, get_competitors
+from services import get_company_financials, get_bulk_financials, MAX_BULK_TICKERS
 
-# Import wikidata functions
-from wikidata import get_wikidata_id, get_wikidata_details, get_funding_rounds
+# Wikidata and Yahoo lookups are fanned out concurrently here
+from company_analysis import analyze_company, DEFAULT_DEADLINE
+from config import get_request_deadline
+from peer_analytics import peer_comparison
 
 logger = logging.getLogger(__name__)
 
@@ -21,16 +23,60 @@ def yfinance_data():
             return jsonify({"error": "Missing ticker in request body"}), 400
 
         ticker = data["ticker"].strip()
-        financial_data = get_company_financials(ticker)
+        financial_data = get_company_financials(ticker, sections=data.get("sections"))
         if not financial_data:
             return jsonify({"error": "Could not fetch financial data"}), 500
 
         return jsonify({"ticker": ticker, "financial_data": financial_data})
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         logger.exception("Unhandled exception in /api/yfinance")
         return jsonify({"error": f"An error occurred: {str(e)}"}), 500
 
 
+@router_bp.route("/api/yfinance/bulk", methods=["POST"])
+def yfinance_bulk_data():
+    try:
+        data = request.get_json()
+        tickers = data.get("tickers") if data else None
+        if not isinstance(tickers, list) or not tickers:
+            return jsonify({"error": "Missing tickers list in request body"}), 400
+        if len(tickers) > MAX_BULK_TICKERS:
+            return (
+                jsonify({"error": f"At most {MAX_BULK_TICKERS} tickers per request"}),
+                400,
+            )
+
+        return jsonify(get_bulk_financials(tickers, sections=data.get("sections")))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.exception("Unhandled exception in /api/yfinance/bulk")
+        return jsonify({"error": f"An error occurred: {str(e)}"}), 500
+
+
+@router_bp.route("/api/peer_comparison", methods=["POST"])
+def peer_comparison_data():
+    try:
+        data = request.get_json()
+        if not data or "ticker" not in data:
+            return jsonify({"error": "Missing ticker in request body"}), 400
+        peers = data.get("peers") or []
+        if len(peers) + 1 > MAX_BULK_TICKERS:
+            return (
+                jsonify({"error": f"At most {MAX_BULK_TICKERS} tickers per request"}),
+                400,
+            )
+
+        return jsonify(peer_comparison(data["ticker"], peers))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.exception("Unhandled exception in /api/peer_comparison")
+        return jsonify({"error": f"An error occurred: {str(e)}"}), 500
+
+
 @router_bp.route("/api/company_analysis", methods=["POST"])
 def company_analysis():
     try:
@@ -39,30 +85,14 @@ def company_analysis():
             return jsonify({"error": "Missing company_name in request body"}), 400
 
         company_name = data["company_name"].strip()
-        wikidata_id = get_wikidata_id(company_name)
-        response_data = {
-            "company_name": company_name,
-            "wikidata_id": wikidata_id,
-            "timestamp": datetime.now().isoformat(),
-        }
-
-        if wikidata_id:
-            response_data["wikidata_details"] = get_wikidata_details(wikidata_id)
-            response_data["funding_rounds"] = get_funding_rounds(wikidata_id)
-
-        ticker = get_ticker_from_name(company_name)
-        response_data["ticker"] = ticker
-
-        if ticker:
-            response_data["financial_data"] = get_company_financials(ticker)
-
-        response_data["competitors"] = get_competitors(
-            company_name=company_name,
-            wikidata_id=wikidata_id,
-            ticker=ticker,
-            industry=response_data.get("wikidata_details", {}).get("Industry"),
+        deadline = get_request_deadline(data.get("deadline"), DEFAULT_DEADLINE)
+        response_data = asyncio.run(
+            analyze_company(
+                company_name,
+                deadline=deadline,
+                use_reference=str(data.get("use_reference", True)).lower() == "true",
+            )
         )
-
         return jsonify(response_data)
 
     except Exception as e:
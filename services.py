@@ -1,200 +1,340 @@
 import requests
 import yfinance as yf
 import logging
+import math
 import time
-import json
-from functools import wraps
+import os
 import redis
-from datetime import datetime, timedelta
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from config import get_cache_folder
+from http_client import get_http_client
+from name_resolution import canonical_name, learn_name, name_key
+from rate_limiter import RateLimitExceeded, get_limiter, rate_limited
+from tiered_cache import TieredCache
+from ttl_cache import TTLCache, Singleflight
 
 logger = logging.getLogger(__name__)
 
-# Initialize Redis client
+# Initialize Redis client. redis.Redis connects lazily, so reachability is
+# tracked by the cache's circuit breaker rather than checked here.
 try:
     redis_client = redis.Redis(
-        host="localhost",  # Change this to your Redis host
-        port=6379,
+        host=os.getenv("REDIS_HOST", "localhost"),
+        port=int(os.getenv("REDIS_PORT", 6379)),
         db=0,
-        decode_responses=True,
+        socket_connect_timeout=0.5,
+        socket_timeout=0.5,
     )
 except Exception as e:
-    logger.warning(f"Redis connection failed: {e}. Running without cache.")
+    logger.warning(f"Redis connection failed: {e}. Running without Redis.")
     redis_client = None
 
-# Rate limiting configuration
-RATE_LIMIT_PERIOD = 60  # seconds
-MAX_REQUESTS = 50
-last_request_time = 0
-request_count = 0
-
-
-def rate_limit_decorator(func):
-    @wraps(func)
-    def wrapper(*args, **kwargs):
-        global last_request_time, request_count
-
-        current_time = time.time()
-        if current_time - last_request_time > RATE_LIMIT_PERIOD:
-            last_request_time = current_time
-            request_count = 0
-
-        if request_count >= MAX_REQUESTS:
-            sleep_time = RATE_LIMIT_PERIOD - (current_time - last_request_time)
-            if sleep_time > 0:
-                time.sleep(sleep_time)
-            last_request_time = time.time()
-            request_count = 0
-
-        request_count += 1
-        return func(*args, **kwargs)
-
-    return wrapper
+cache = TieredCache(
+    redis_client=redis_client,
+    disk_path=Path(get_cache_folder()) / "services_cache.sqlite",
+    memory_entries=int(os.getenv("SERVICE_CACHE_ENTRIES", "2048")),
+    memory_ttl=float(os.getenv("SERVICE_CACHE_MEMORY_TTL", "300")),
+)
 
 
 def get_cached_data(key):
-    if not redis_client:
-        return None
-    try:
-        data = redis_client.get(key)
-        return json.loads(data) if data else None
-    except Exception as e:
-        logger.error(f"Cache retrieval error: {e}")
-        return None
+    return cache.get(key)
 
 
 def set_cached_data(key, data, expiry_hours=24):
-    if not redis_client:
-        return
-    try:
-        redis_client.setex(key, timedelta(hours=expiry_hours), json.dumps(data))
-    except Exception as e:
-        logger.error(f"Cache storage error: {e}")
+    cache.set(key, data, ttl=expiry_hours * 3600)
+
+
+_ticker_flight = Singleflight()
 
 
-@rate_limit_decorator
 def get_ticker_from_name(company_name):
-    cache_key = f"ticker:{company_name}"
+    # Name variants ("Infosys", "infosys ltd") share one cache entry and query.
+    cache_key = f"ticker:{name_key(company_name)}"
     cached_result = get_cached_data(cache_key)
     if cached_result:
         return cached_result
+    return _ticker_flight.do(cache_key, lambda: _search_ticker(company_name, cache_key))
 
-    url = f"https://query2.finance.yahoo.com/v1/finance/search?q={company_name}"
+
+def _search_ticker(company_name, cache_key):
+    query = canonical_name(company_name)
+    url = f"https://query2.finance.yahoo.com/v1/finance/search?q={query}"
     headers = {"User-Agent": "Mozilla/5.0"}
     try:
-        response = requests.get(url, headers=headers, timeout=5)
+        get_limiter("yahoo_search").acquire()
+        response = get_http_client().get(url, headers=headers, timeout=5)
         response.raise_for_status()
         data = response.json()
         ticker = (
             data.get("quotes", [{}])[0].get("symbol") if data.get("quotes") else None
         )
-    except requests.exceptions.RequestException as e:
+    except (requests.exceptions.RequestException, RateLimitExceeded) as e:
         logger.error(f"Error fetching ticker for {company_name}: {e}")
         return None
 
     if ticker:
         set_cached_data(cache_key, ticker)
+        learn_name(query)
     return ticker
 
 
-def get_company_financials(ticker):
+# yfinance ``info`` fields projected into each financials section.
+FINANCIAL_SECTIONS = {
+    "company_info": {
+        "Company Name": "longName",
+        "Sector": "sector",
+        "Industry": "industry",
+        "Country": "country",
+        "Website": "website",
+        "Description": "longBusinessSummary",
+        "Full Time Employees": "fullTimeEmployees",
+    },
+    "market_data": {
+        "Market Cap": "marketCap",
+        "Current Price": "currentPrice",
+        "52 Week High": "fiftyTwoWeekHigh",
+        "52 Week Low": "fiftyTwoWeekLow",
+        "50 Day Average": "fiftyDayAverage",
+        "200 Day Average": "twoHundredDayAverage",
+        "Volume": "volume",
+        "Average Volume": "averageVolume",
+    },
+    "financial_metrics": {
+        "PE Ratio": "trailingPE",
+        "Forward PE": "forwardPE",
+        "EPS": "trailingEps",
+        "Forward EPS": "forwardEps",
+        "PEG Ratio": "pegRatio",
+        "Price to Book": "priceToBook",
+        "Price to Sales": "priceToSalesTrailing12Months",
+        "Beta": "beta",
+    },
+    "income_statement": {
+        "Revenue": "totalRevenue",
+        "Revenue Growth": "revenueGrowth",
+        "Gross Profits": "grossProfits",
+        "EBITDA": "ebitda",
+        "Net Income": "netIncomeToCommon",
+        "Profit Margin": "profitMargins",
+        "Operating Margin": "operatingMargins",
+        "Gross Margin": "grossMargins",
+    },
+    "balance_sheet": {
+        "Total Cash": "totalCash",
+        "Total Debt": "totalDebt",
+        "Current Ratio": "currentRatio",
+        "Quick Ratio": "quickRatio",
+        "Total Assets": "totalAssets",
+        "Total Liabilities": "totalDebt",
+        "Book Value": "bookValue",
+    },
+    "dividend_info": {
+        "Dividend Rate": "dividendRate",
+        "Dividend Yield": "dividendYield",
+        "Payout Ratio": "payoutRatio",
+        "Ex-Dividend Date": "exDividendDate",
+    },
+}
+
+# Price-driven sections go stale quickly; the rest change with filings.
+FAST_SECTIONS = {"market_data", "financial_metrics"}
+MARKET_DATA_TTL = float(os.getenv("FINANCIALS_MARKET_TTL", "300"))
+PROFILE_TTL = float(os.getenv("FINANCIALS_PROFILE_TTL", str(24 * 3600)))
+# Defaults to the yfinance bucket's burst size, so a cold bulk request fits
+# within the rate budget.
+MAX_BULK_TICKERS = int(os.getenv("MAX_BULK_TICKERS", "0")) or int(
+    get_limiter("yfinance").capacity
+)
+
+# Raw ``info`` payloads are kept briefly in memory so get_company_financials
+# and get_competitors share a single fetch per ticker.
+_info_cache = TTLCache(max_entries=256, ttl=MARKET_DATA_TTL)
+_info_flight = Singleflight()
+
+
+def _section_ttl(section):
+    return MARKET_DATA_TTL if section in FAST_SECTIONS else PROFILE_TTL
+
+
+def _build_section(info, section):
+    return {
+        label: info.get(field, "N/A")
+        for label, field in FINANCIAL_SECTIONS[section].items()
+    }
+
+
+@rate_limited("yfinance")
+def _fetch_ticker_info(ticker):
+    stock = yf.Ticker(ticker)
+
+    # Implement exponential backoff for API requests
+    max_retries = 3
+    retry_delay = 1
+
+    for attempt in range(max_retries):
+        try:
+            return stock.info
+        except Exception as e:
+            if attempt == max_retries - 1:
+                raise
+            logger.warning(f"Retrying financials for {ticker}: {e}")
+            time.sleep(retry_delay)
+            retry_delay *= 2
+
+
+def get_ticker_info(ticker):
+    """Return yfinance ``info`` for a ticker, fetching it at most once per
+    MARKET_DATA_TTL and coalescing concurrent requests."""
+    info = _info_cache.get(ticker)
+    if info is not None:
+        return info
+
+    def load():
+        info = _fetch_ticker_info(ticker) or {}
+        if info:
+            _info_cache.set(ticker, info)
+        return info
+
+    return _info_flight.do(ticker, load)
+
+
+def _normalize_sections(sections):
+    """Requested section names, all of them when ``sections`` is empty; a
+    single name may be given as a string. Raises ValueError for unknown
+    sections."""
+    if isinstance(sections, str):
+        sections = [sections]
+    sections = list(sections or FINANCIAL_SECTIONS)
+    unknown = [
+        section
+        for section in sections
+        if not isinstance(section, str) or section not in FINANCIAL_SECTIONS
+    ]
+    if unknown:
+        raise ValueError(
+            f"Unknown sections {unknown}; expected some of {list(FINANCIAL_SECTIONS)}"
+        )
+    return list(dict.fromkeys(sections))
+
+
+def _load_company_financials(ticker, sections):
+    """Cached section lookup behind get_company_financials; raises on
+    upstream failure."""
+    result = {}
+    missing = []
+    for section in sections:
+        cached_section = get_cached_data(f"financials:{ticker}:{section}")
+        if cached_section:
+            result[section] = cached_section
+        else:
+            missing.append(section)
+
+    if missing:
+        info = get_ticker_info(ticker)
+        for section in missing:
+            result[section] = _build_section(info, section)
+            # An empty info (unknown ticker or upstream hiccup) is not cached.
+            if not info:
+                continue
+            set_cached_data(
+                f"financials:{ticker}:{section}",
+                result[section],
+                expiry_hours=_section_ttl(section) / 3600,
+            )
+
+    return {section: result[section] for section in sections}
+
+
+def get_company_financials(ticker, sections=None):
+    """Financial data for ``ticker`` grouped by section.
+
+    Each section is cached separately with its own TTL, and ``sections``
+    restricts the result (and any upstream fetch) to the listed sections.
+    Raises ValueError for unknown sections.
+    """
+    sections = _normalize_sections(sections)
     try:
-        stock = yf.Ticker(ticker)
-
-        # Implement exponential backoff for API requests
-        max_retries = 3
-        retry_delay = 1
-
-        for attempt in range(max_retries):
-            try:
-                info = stock.info
-
-        # ...existing code building company_info...
-        company_info = {
-            "Company Name": info.get("longName", "N/A"),
-            "Sector": info.get("sector", "N/A"),
-            "Industry": info.get("industry", "N/A"),
-            "Country": info.get("country", "N/A"),
-            "Website": info.get("website", "N/A"),
-            "Description": info.get("longBusinessSummary", "N/A"),
-            "Full Time Employees": info.get("fullTimeEmployees", "N/A"),
-        }
-
-        # ...existing code building market_data...
-        market_data = {
-            "Market Cap": info.get("marketCap", "N/A"),
-            "Current Price": info.get("currentPrice", "N/A"),
-            "52 Week High": info.get("fiftyTwoWeekHigh", "N/A"),
-            "52 Week Low": info.get("fiftyTwoWeekLow", "N/A"),
-            "50 Day Average": info.get("fiftyDayAverage", "N/A"),
-            "200 Day Average": info.get("twoHundredDayAverage", "N/A"),
-            "Volume": info.get("volume", "N/A"),
-            "Average Volume": info.get("averageVolume", "N/A"),
-        }
-
-        # ...existing code building financial_metrics...
-        financial_metrics = {
-            "PE Ratio": info.get("trailingPE", "N/A"),
-            "Forward PE": info.get("forwardPE", "N/A"),
-            "EPS": info.get("trailingEps", "N/A"),
-            "Forward EPS": info.get("forwardEps", "N/A"),
-            "PEG Ratio": info.get("pegRatio", "N/A"),
-            "Price to Book": info.get("priceToBook", "N/A"),
-            "Price to Sales": info.get("priceToSalesTrailing12Months", "N/A"),
-            "Beta": info.get("beta", "N/A"),
-        }
-
-        # ...existing code building income_statement...
-        income_statement = {
-            "Revenue": info.get("totalRevenue", "N/A"),
-            "Revenue Growth": info.get("revenueGrowth", "N/A"),
-            "Gross Profits": info.get("grossProfits", "N/A"),
-            "EBITDA": info.get("ebitda", "N/A"),
-            "Net Income": info.get("netIncomeToCommon", "N/A"),
-            "Profit Margin": info.get("profitMargins", "N/A"),
-            "Operating Margin": info.get("operatingMargins", "N/A"),
-            "Gross Margin": info.get("grossMargins", "N/A"),
-        }
-
-        # ...existing code building balance_sheet...
-        balance_sheet = {
-            "Total Cash": info.get("totalCash", "N/A"),
-            "Total Debt": info.get("totalDebt", "N/A"),
-            "Current Ratio": info.get("currentRatio", "N/A"),
-            "Quick Ratio": info.get("quickRatio", "N/A"),
-            "Total Assets": info.get("totalAssets", "N/A"),
-            "Total Liabilities": info.get("totalDebt", "N/A"),
-            "Book Value": info.get("bookValue", "N/A"),
-        }
-
-        # ...existing code building dividend_info...
-        dividend_info = {
-            "Dividend Rate": info.get("dividendRate", "N/A"),
-            "Dividend Yield": info.get("dividendYield", "N/A"),
-            "Payout Ratio": info.get("payoutRatio", "N/A"),
-            "Ex-Dividend Date": info.get("exDividendDate", "N/A"),
-        }
-
-        return {
-            "company_info": company_info,
-            "market_data": market_data,
-            "financial_metrics": financial_metrics,
-            "income_statement": income_statement,
-            "balance_sheet": balance_sheet,
-            "dividend_info": dividend_info,
-        }
+        return _load_company_financials(ticker, sections)
     except Exception as e:
         logger.error(f"Error fetching financial data for ticker {ticker}: {e}")
         return None
 
 
+def get_bulk_financials(tickers, sections=None, max_workers=None):
+    """Fetch financials for many tickers concurrently as a columnar table.
+
+    Tickers are upper-cased and de-duplicated. Cached sections are served
+    locally and upstream calls stay within the yfinance rate limiter. The
+    result has a ``tickers`` list, a ``columns`` mapping of
+    "section.label" to one value per ticker ("N/A" becomes None, so numeric
+    columns load straight into ``numpy.array(..., dtype=float)``) and an
+    ``errors`` mapping for tickers that failed. Tickers that ran out of rate
+    budget are listed under ``rate_limited`` instead, with ``retry_after``
+    seconds until the bucket can serve them all.
+
+    Raises ValueError if a ticker is not a string or a section is unknown.
+    """
+    if any(t is not None and not isinstance(t, str) for t in tickers):
+        raise ValueError("Tickers must be strings")
+    tickers = list(
+        dict.fromkeys(t.strip().upper() for t in tickers if t and t.strip())
+    )
+    sections = _normalize_sections(sections)
+    max_workers = max_workers or int(os.getenv("BULK_FINANCIALS_WORKERS", "8"))
+
+    rows = {}
+    errors = {}
+    rate_limited = []
+    if tickers and sections:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(tickers))) as pool:
+            futures = {
+                pool.submit(_load_company_financials, ticker, sections): ticker
+                for ticker in tickers
+            }
+            for future in as_completed(futures):
+                ticker = futures[future]
+                try:
+                    rows[ticker] = future.result()
+                except RateLimitExceeded:
+                    rate_limited.append(ticker)
+                except Exception as e:
+                    logger.error(f"Bulk financials failed for {ticker}: {e}")
+                    errors[ticker] = str(e)
+
+    ok_tickers = [ticker for ticker in tickers if ticker in rows]
+    columns = {}
+    for section in sections:
+        for label in FINANCIAL_SECTIONS[section]:
+            columns[f"{section}.{label}"] = [
+                None
+                if rows[ticker][section].get(label) == "N/A"
+                else rows[ticker][section].get(label)
+                for ticker in ok_tickers
+            ]
+    rate_limited.sort(key=tickers.index)
+    limiter = get_limiter("yfinance")
+    return {
+        "tickers": ok_tickers,
+        "columns": columns,
+        "errors": errors,
+        "rate_limited": rate_limited,
+        "retry_after": math.ceil(len(rate_limited) / limiter.rate),
+    }
+
+
 def get_competitors(company_name, wikidata_id=None, ticker=None, industry=None):
-    import yfinance as yf  # Needed here for accessing stock info
+    cache_key = f"competitors:{ticker or company_name}"
+    cached_result = get_cached_data(cache_key)
+    if cached_result:
+        return cached_result
 
     competitors = []
     if ticker:
         try:
-            stock = yf.Ticker(ticker)
-            all_competitors = stock.info.get("competitors", [])
+            all_competitors = get_ticker_info(ticker).get("competitors", [])
             competitors = [c for c in all_competitors if c != company_name]
         except Exception:
             pass
@@ -202,4 +342,6 @@ def get_competitors(company_name, wikidata_id=None, ticker=None, industry=None):
         # In this simple integration, we assume that if no competitors from ticker,
         # an empty list is returned (or a default message).
         competitors = []
+    else:
+        set_cached_data(cache_key, competitors)
     return competitors or ["No competitors found"]
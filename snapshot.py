@@ -0,0 +1,288 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from config import get_cache_folder, get_context_folder, get_data_folder
+
+logger = logging.getLogger(__name__)
+
+# Bump when the on-disk layout changes so old snapshots are rebuilt.
+FORMAT_VERSION = 2
+TABLE_SUFFIXES = (".xlsx", ".xls", ".csv")
+# numpy dtype kinds stored as-is: bool, int, uint, float, datetime.
+NUMERIC_KINDS = "biufM"
+SNAPSHOTS_ENABLED = os.getenv("SNAPSHOTS_ENABLED", "true").lower() == "true"
+
+_build_lock = threading.Lock()
+
+
+def snapshot_folder() -> Path:
+    return get_cache_folder() / "snapshots"
+
+
+def _signature(source: Path) -> Dict[str, int]:
+    stat = source.stat()
+    return {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+
+
+def _snapshot_dir(source: Path) -> Path:
+    """Per-source folder holding build directories and a CURRENT pointer."""
+    digest = hashlib.sha256(str(source.resolve()).encode("utf-8")).hexdigest()
+    return snapshot_folder() / f"{source.stem}-{digest[:12]}"
+
+
+def current_build(root: Path) -> Optional[Path]:
+    """Build directory the CURRENT pointer in ``root`` names, if any."""
+    try:
+        name = (root / "CURRENT").read_text(encoding="utf-8").strip()
+    except OSError:
+        return None
+    return root / name if name else None
+
+
+def publish_build(root: Path, build: Path) -> None:
+    """Point CURRENT at ``build`` atomically and drop builds older than the
+    one it replaces, which readers may still have open."""
+    previous = current_build(root)
+    pointer = root / f".CURRENT-{build.name}"
+    pointer.write_text(build.name, encoding="utf-8")
+    os.replace(pointer, root / "CURRENT")
+    for path in root.iterdir():
+        # Staging directories get meta.json last; leave unfinished ones alone.
+        finished = (path / "meta.json").exists()
+        if finished and path not in (build, previous):
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def _read_source(source: Path) -> pd.DataFrame:
+    if source.suffix.lower() == ".csv":
+        return pd.read_csv(source)
+    return pd.read_excel(source)
+
+
+def _column_kind(series: pd.Series) -> str:
+    if isinstance(series.dtype, np.dtype) and series.dtype.kind in NUMERIC_KINDS:
+        return "numeric"
+    # Mixed-type columns are stored as JSON per cell so numbers survive.
+    return "text" if all(isinstance(v, str) for v in series.dropna()) else "json"
+
+
+def _encode_cells(series: pd.Series, kind: str) -> List[Optional[bytes]]:
+    encode = (lambda v: json.dumps(v, default=str)) if kind == "json" else str
+    return [
+        None if null else encode(value).encode("utf-8")
+        for value, null in zip(series.tolist(), series.isna().tolist())
+    ]
+
+
+def _write_text(directory: Path, cells: List[Optional[bytes]]) -> None:
+    """Store all non-numeric cells Arrow-style: one UTF-8 buffer, int64
+    offsets and a null mask, laid out column after column."""
+    offsets = np.zeros(len(cells) + 1, dtype=np.int64)
+    np.cumsum([len(cell) if cell else 0 for cell in cells], out=offsets[1:])
+    blob = b"".join(cell for cell in cells if cell)
+    np.save(directory / "text.data.npy", np.frombuffer(blob, dtype=np.uint8))
+    np.save(directory / "text.offsets.npy", offsets)
+    np.save(directory / "text.mask.npy", np.array([c is None for c in cells]))
+
+
+class _TextReader:
+    def __init__(self, directory: Path):
+        self.raw = np.load(directory / "text.data.npy", mmap_mode="r")
+        self.offsets = np.load(directory / "text.offsets.npy", mmap_mode="r")
+        self.mask = np.load(directory / "text.mask.npy", mmap_mode="r")
+
+    def column(self, slot: int, rows: int, kind: str) -> np.ndarray:
+        start = slot * rows
+        offsets = self.offsets[start : start + rows + 1].tolist()
+        mask = self.mask[start : start + rows].tolist()
+        # Copy only this column's bytes out of the mapped buffer.
+        base = offsets[0]
+        raw = self.raw[base : offsets[-1]].tobytes()
+        offsets = [offset - base for offset in offsets]
+        if kind == "json":
+            cells = [
+                None if null else json.loads(raw[a:b].decode("utf-8"))
+                for null, a, b in zip(mask, offsets, offsets[1:])
+            ]
+        else:
+            cells = [
+                None if null else raw[a:b].decode("utf-8")
+                for null, a, b in zip(mask, offsets, offsets[1:])
+            ]
+        values = np.empty(rows, dtype=object)
+        values[:] = cells
+        return values
+
+
+def build_snapshot(source: Union[str, Path]) -> Path:
+    """Compile a spreadsheet/CSV into a columnar snapshot directory.
+
+    Numeric columns are saved as plain ``.npy`` arrays; everything else as
+    UTF-8 text in one shared buffer. Each build goes to a fresh directory
+    and the CURRENT pointer is switched atomically once it is complete, so
+    readers never see a partial build.
+    """
+    source = Path(source)
+    signature = _signature(source)
+    df = _read_source(source)
+    root = _snapshot_dir(source)
+    if root.exists() and not (root / "CURRENT").exists():
+        shutil.rmtree(root)  # Format 1 layout.
+    root.mkdir(parents=True, exist_ok=True)
+    staging = Path(tempfile.mkdtemp(dir=root, prefix="build-"))
+    try:
+        columns, cells = [], []
+        for i, name in enumerate(df.columns):
+            series = df.iloc[:, i]
+            kind = _column_kind(series)
+            column = {"name": name, "kind": kind}
+            if kind == "numeric":
+                np.save(staging / f"c{i}.npy", series.to_numpy())
+            else:
+                column["slot"] = len(cells) // max(len(df), 1)
+                cells.extend(_encode_cells(series, kind))
+            columns.append(column)
+        _write_text(staging, cells)
+        meta = {
+            "format": FORMAT_VERSION,
+            "source": str(source.resolve()),
+            "signature": signature,
+            "rows": len(df),
+            "columns": columns,
+        }
+        (staging / "meta.json").write_text(json.dumps(meta), encoding="utf-8")
+        publish_build(root, staging)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    logger.info(f"Built snapshot for {source.name} ({len(df)} rows)")
+    return staging
+
+
+def _fresh_meta(source: Path) -> Optional[Tuple[Dict, Path]]:
+    """Metadata and directory of the current build, if it matches ``source``."""
+    directory = current_build(_snapshot_dir(source))
+    if directory is None:
+        return None
+    try:
+        meta = json.loads((directory / "meta.json").read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if meta.get("format") != FORMAT_VERSION:
+        return None
+    if meta.get("signature") != _signature(source):
+        return None
+    return meta, directory
+
+
+def is_fresh(source: Union[str, Path]) -> bool:
+    return _fresh_meta(Path(source)) is not None
+
+
+def load_columns(
+    source: Union[str, Path],
+    columns: Optional[Iterable] = None,
+    build: bool = True,
+) -> Dict:
+    """Column arrays for ``source`` read from its snapshot.
+
+    Numeric columns come back as read-only memory-mapped arrays, other
+    columns as object arrays with None for blanks. The snapshot is (re)built
+    when missing or older than the source; with ``build=False`` a stale snapshot
+    raises FileNotFoundError instead.
+    """
+    source = Path(source)
+    current = _fresh_meta(source)
+    if current is None:
+        if not build:
+            raise FileNotFoundError(f"No fresh snapshot for {source}")
+        with _build_lock:
+            current = _fresh_meta(source)
+            if current is None:
+                build_snapshot(source)
+                current = _fresh_meta(source)
+    if current is None:
+        raise FileNotFoundError(f"Snapshot for {source} changed while loading")
+    meta, directory = current
+    wanted = None if columns is None else list(columns)
+    text = _TextReader(directory)
+    result = {}
+    for i, column in enumerate(meta["columns"]):
+        name = column["name"]
+        if wanted is not None and name not in wanted:
+            continue
+        if column["kind"] == "numeric":
+            result[name] = np.load(directory / f"c{i}.npy", mmap_mode="r")
+        else:
+            result[name] = text.column(column["slot"], meta["rows"], column["kind"])
+    if wanted is not None:
+        missing = [name for name in wanted if name not in result]
+        if missing:
+            raise ValueError(f"Columns not found in {source.name}: {missing}")
+        result = {name: result[name] for name in wanted}
+    return result
+
+
+def read_table(
+    source: Union[str, Path], columns: Optional[Iterable] = None
+) -> pd.DataFrame:
+    """DataFrame for a spreadsheet/CSV, served from its snapshot when enabled."""
+    source = Path(source)
+    if not SNAPSHOTS_ENABLED:
+        df = _read_source(source)
+        return df if columns is None else df[list(columns)]
+    try:
+        return pd.DataFrame(load_columns(source, columns))
+    except OSError as e:
+        logger.warning(f"Snapshot unavailable for {source.name}, reading source: {e}")
+        df = _read_source(source)
+        return df if columns is None else df[list(columns)]
+
+
+def table_files(*folders: Union[str, Path]) -> List[Path]:
+    files = []
+    for folder in folders:
+        folder = Path(folder)
+        if folder.is_dir():
+            files.extend(
+                path
+                for path in sorted(folder.glob("**/*"))
+                if path.suffix.lower() in TABLE_SUFFIXES
+            )
+    return files
+
+
+def build_all(
+    folders: Optional[Iterable[Union[str, Path]]] = None, force: bool = False
+) -> List[Path]:
+    """Compile every table in ``folders`` (data/ and the context folder by
+    default); up-to-date snapshots are skipped unless ``force`` is set."""
+    if folders is None:
+        folders = [get_data_folder(), get_context_folder()]
+    built = []
+    for source in table_files(*folders):
+        if force or not is_fresh(source):
+            try:
+                build_snapshot(source)
+                built.append(source)
+            except Exception as e:
+                logger.error(f"Failed to snapshot {source}: {e}")
+    return built
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    built = build_all(args or None, force="--force" in sys.argv)
+    print(f"Built {len(built)} snapshot(s) in {snapshot_folder()}")
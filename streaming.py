@@ -0,0 +1,97 @@
+import asyncio
+import json
+import logging
+import os
+from typing import Any, AsyncIterator, Dict, Optional
+
+from company_analysis import analyze_company
+
+logger = logging.getLogger(__name__)
+
+# Seconds a streamed response may go without producing an item. The default
+# leaves headroom over a file chunk's time budget (BATCH_ITEM_TIMEOUT).
+STREAM_IDLE_TIMEOUT = float(
+    os.getenv("STREAM_IDLE_TIMEOUT")
+    or max(60.0, float(os.getenv("BATCH_ITEM_TIMEOUT", "60")) + 30)
+)
+
+_DONE = object()
+
+
+async def stream_categorization(
+    categorizer,
+    company_name: str,
+    enrich: bool = True,
+    deadline: Optional[float] = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """Yield categorization events for one company as soon as each is ready.
+
+    ``rule_based`` is sent immediately, followed by ``reference`` for
+    companies known locally (which then skip Gemini). After that,
+    ``ai_chunk`` events (while Gemini streams) and ``ai_based`` (the parsed
+    result) interleave with ``enrichment`` events as each Wikidata/Yahoo
+    source finishes. ``done`` is always last.
+    """
+    yield {
+        "event": "rule_based",
+        "company": company_name,
+        "data": categorizer.categorize_company_rules(company_name),
+    }
+    reference = await asyncio.to_thread(categorizer.lookup_reference, company_name)
+    if reference is not None:
+        yield {"event": "reference", "company": company_name, "data": reference}
+
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def produce_ai() -> None:
+        try:
+            async for kind, value in categorizer.stream_company_ai(company_name):
+                if kind == "chunk":
+                    await queue.put({"event": "ai_chunk", "text": value})
+                else:
+                    await queue.put({"event": "ai_based", "data": value})
+        finally:
+            await queue.put(_DONE)
+
+    async def produce_enrichment() -> None:
+        def on_source(name: str, status: str, value: Any) -> None:
+            queue.put_nowait(
+                {"event": "enrichment", "source": name, "status": status, "data": value}
+            )
+
+        try:
+            summary = await analyze_company(
+                company_name, deadline=deadline, on_source=on_source
+            )
+            await queue.put({"event": "enrichment_status", "data": summary["sources"]})
+        except Exception as e:
+            logger.error(f"Enrichment failed for {company_name}: {e}")
+        finally:
+            await queue.put(_DONE)
+
+    producers = []
+    if reference is None:
+        producers.append(asyncio.ensure_future(produce_ai()))
+    if enrich:
+        producers.append(asyncio.ensure_future(produce_enrichment()))
+
+    remaining = len(producers)
+    try:
+        while remaining:
+            item = await queue.get()
+            if item is _DONE:
+                remaining -= 1
+                continue
+            yield item
+    finally:
+        for producer in producers:
+            producer.cancel()
+    yield {"event": "done", "company": company_name}
+
+
+def format_ndjson(event: Dict[str, Any]) -> str:
+    return json.dumps(event, default=str) + "\n"
+
+
+def format_sse(event: Dict[str, Any]) -> str:
+    return f"event: {event['event']}\ndata: {json.dumps(event, default=str)}\n\n"
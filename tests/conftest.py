@@ -0,0 +1,9 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Keep caches, journals and stores out of the working tree.
+os.environ.setdefault("CACHE_FOLDER", tempfile.mkdtemp(prefix="categorizer-tests-"))
+os.environ.setdefault("USE_AI", "false")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
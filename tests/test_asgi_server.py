@@ -0,0 +1,28 @@
+import asyncio
+import json
+
+from starlette.testclient import TestClient
+
+import asgi_server
+
+
+def test_stalled_file_stream_ends_with_an_error(monkeypatch):
+    closed = []
+
+    async def stalled(file_path, clean_output=False):
+        try:
+            yield "Acme", {"rule_based": {}}
+            await asyncio.sleep(60)
+        finally:
+            closed.append(file_path)
+
+    monkeypatch.setattr(asgi_server.instance, "iter_file_results", stalled)
+    monkeypatch.setattr(asgi_server, "STREAM_IDLE_TIMEOUT", 0.05)
+
+    response = TestClient(asgi_server.app).get(
+        "/categorize_file", params={"file_path": "companies.csv", "stream": "true"}
+    )
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines[0]["company"] == "Acme"
+    assert lines[1] == {"error": "Error processing file: No progress for 0.05s"}
+    assert closed == ["companies.csv"]
@@ -0,0 +1,76 @@
+import asyncio
+import json
+
+from app import CompanyCategorizerApp
+from company_domain_categorizer import DomainCategorizer
+
+
+def parse(entries, names):
+    categorizer = DomainCategorizer.__new__(DomainCategorizer)
+    return categorizer._parse_batch_ai_response(json.dumps(entries), names)
+
+
+def test_entries_are_matched_by_company_name():
+    parsed = parse(
+        [{"company": "beta", "category": "B"}, {"company": "Alpha", "category": "A"}],
+        ["Alpha", "Beta"],
+    )
+    assert parsed["Alpha"]["category"] == "A"
+    assert parsed["Beta"]["category"] == "B"
+
+
+def test_misnamed_entry_is_not_assigned_by_position():
+    parsed = parse(
+        [
+            {"company": "Beta Labs", "category": "B"},
+            {"company": "Alpha", "category": "A"},
+        ],
+        ["Alpha", "Beta"],
+    )
+    assert parsed == {"Alpha": {"company": "Alpha", "category": "A"}}
+
+
+def test_unnamed_entries_fall_back_to_position():
+    parsed = parse([{"category": "A"}, {"category": "B"}], ["Alpha", "Beta"])
+    assert parsed["Alpha"]["category"] == "A"
+    assert parsed["Beta"]["category"] == "B"
+
+
+def test_unnamed_entries_of_the_wrong_length_are_dropped():
+    assert parse([{"category": "A"}], ["Alpha", "Beta"]) == {}
+
+
+class SlowBatchCategorizer:
+    async def categorize_companies(self, names, clean_output=False):
+        if len(names) > 1:
+            await asyncio.sleep(10)
+        return [{"company": name} for name in names]
+
+
+def test_timed_out_chunk_falls_back_to_single_companies():
+    app = CompanyCategorizerApp.__new__(CompanyCategorizerApp)
+    app.categorizer = SlowBatchCategorizer()
+    app.item_timeout = 0.05
+    results = asyncio.run(app._categorize_many(["Alpha", "Beta"], False))
+    assert results == [{"company": "Alpha"}, {"company": "Beta"}]
+
+
+class SlowCategorizer:
+    async def categorize_companies(self, names, clean_output=False):
+        await asyncio.sleep(10)
+
+
+def test_chunk_and_retries_share_one_time_budget():
+    app = CompanyCategorizerApp.__new__(CompanyCategorizerApp)
+    app.categorizer = SlowCategorizer()
+    app.item_timeout = 0.2
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        results = await app._categorize_many(["Alpha", "Beta"], False)
+        return results, loop.time() - started
+
+    results, elapsed = asyncio.run(run())
+    assert all(result["error"].startswith("Timed out") for result in results)
+    assert elapsed < 0.3
@@ -0,0 +1,47 @@
+import json
+
+import pytest
+
+from context_loader import ContextCache, _mentions
+
+
+def test_values_match_terms_on_whole_words():
+    assert _mentions("Acme", ("acme software",))
+    assert _mentions("Cloud Software Vendors", ("software",))
+    assert not _mentions("Retail", ("ai",))
+    assert not _mentions("Acme", ("acmeville holdings",))
+
+
+def test_filler_words_and_legal_suffixes_do_not_match():
+    assert not _mentions("Inc", ("zzyzx holdings inc",))
+    assert not _mentions("and", ("procter and gamble",))
+    assert _mentions("Procter and Gamble", ("procter and gamble",))
+
+
+def test_selection_comes_with_the_version_it_was_built_from(tmp_path):
+    path = tmp_path / "context.json"
+    path.write_text(json.dumps({"competitors": {"Software": ["Acme", "Inc"]}}))
+    cache = ContextCache(tmp_path)
+    version, selected = cache.select_versioned(["Acme Software"])
+    assert selected == {"competitors": {"Software": ("Acme", "Inc")}}
+    assert version == cache.get_versioned()[0]
+
+    path.write_text(json.dumps({"competitors": {"Hardware": ["Acme", "Inc"]}}))
+    new_version, selected = cache.select_versioned(["Acme Software"])
+    assert new_version != version
+    assert selected == {"competitors": {"Hardware": ("Acme",)}}
+
+
+def test_cached_context_cannot_be_changed_in_place(tmp_path):
+    (tmp_path / "context.json").write_text(
+        json.dumps({"competitors": {"Software": [{"name": "Acme"}]}})
+    )
+    context = ContextCache(tmp_path).get()
+    entries = context["competitors"]["Software"]
+    with pytest.raises(AttributeError):
+        entries.append({"name": "Globex"})
+    with pytest.raises(TypeError):
+        entries[0]["name"] = "Globex"
+    assert json.loads(json.dumps(context))["competitors"]["Software"] == [
+        {"name": "Acme"}
+    ]
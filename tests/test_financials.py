@@ -0,0 +1,101 @@
+import pytest
+
+import services
+
+
+def test_sections_accept_a_single_name():
+    assert services._normalize_sections("market_data") == ["market_data"]
+    assert services._normalize_sections(None) == list(services.FINANCIAL_SECTIONS)
+
+
+def test_unknown_sections_are_rejected():
+    with pytest.raises(ValueError, match="bogus"):
+        services.get_company_financials("AAPL", sections=["market_data", "bogus"])
+
+
+BASELINE_SECTIONS = {
+    "company_info": [
+        "Company Name",
+        "Sector",
+        "Industry",
+        "Country",
+        "Website",
+        "Description",
+        "Full Time Employees",
+    ],
+    "market_data": [
+        "Market Cap",
+        "Current Price",
+        "52 Week High",
+        "52 Week Low",
+        "50 Day Average",
+        "200 Day Average",
+        "Volume",
+        "Average Volume",
+    ],
+    "financial_metrics": [
+        "PE Ratio",
+        "Forward PE",
+        "EPS",
+        "Forward EPS",
+        "PEG Ratio",
+        "Price to Book",
+        "Price to Sales",
+        "Beta",
+    ],
+    "income_statement": [
+        "Revenue",
+        "Revenue Growth",
+        "Gross Profits",
+        "EBITDA",
+        "Net Income",
+        "Profit Margin",
+        "Operating Margin",
+        "Gross Margin",
+    ],
+    "balance_sheet": [
+        "Total Cash",
+        "Total Debt",
+        "Current Ratio",
+        "Quick Ratio",
+        "Total Assets",
+        "Total Liabilities",
+        "Book Value",
+    ],
+    "dividend_info": [
+        "Dividend Rate",
+        "Dividend Yield",
+        "Payout Ratio",
+        "Ex-Dividend Date",
+    ],
+}
+
+
+def test_section_labels_match_baseline():
+    sections = {
+        section: list(fields) for section, fields in services.FINANCIAL_SECTIONS.items()
+    }
+    assert sections == BASELINE_SECTIONS
+
+
+def test_peer_comparison_sections_exist():
+    from peer_analytics import METRIC_COLUMNS
+
+    for column in METRIC_COLUMNS.values():
+        section, label = column.split(".", 1)
+        assert label in services.FINANCIAL_SECTIONS[section]
+
+
+def test_empty_info_is_not_cached(monkeypatch):
+    stored = []
+    monkeypatch.setattr(services, "get_cached_data", lambda key: None)
+    monkeypatch.setattr(
+        services, "set_cached_data", lambda *args, **kwargs: stored.append(args)
+    )
+    monkeypatch.setattr(services, "_fetch_ticker_info", lambda ticker: {})
+    services._info_cache.clear()
+
+    result = services.get_company_financials("NOPE", sections="market_data")
+    assert set(result["market_data"].values()) == {"N/A"}
+    assert stored == []
+    assert services._info_cache.get("NOPE") is None
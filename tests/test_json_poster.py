@@ -0,0 +1,105 @@
+import json
+import threading
+import time
+
+import pytest
+
+import json_poster
+from json_poster import DeliveryQueue
+
+
+@pytest.fixture(autouse=True)
+def fast_delivery(monkeypatch):
+    monkeypatch.setattr(json_poster, "FLUSH_INTERVAL", 0.01)
+    monkeypatch.setattr(json_poster, "MAX_RETRIES", 0)
+    monkeypatch.setattr(json_poster, "BACKOFF_BASE", 0.0)
+
+
+class Sink:
+    def __init__(self):
+        self.up = True
+        self.received = []
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def post(self, payload):
+        self.gate.wait()
+        if not self.up:
+            raise ConnectionError("sink down")
+        self.received.extend(payload if isinstance(payload, list) else [payload])
+
+
+def make_queue(monkeypatch, tmp_path, sink, batch_size=10):
+    monkeypatch.setattr(DeliveryQueue, "_post", lambda self, data: sink.post(data))
+    return DeliveryQueue("http://sink", tmp_path / "journal.ndjson", batch_size)
+
+
+def write_journal(path, lines):
+    path.write_text("".join(lines), encoding="utf-8")
+
+
+def test_partial_journal_line_is_skipped_at_startup(monkeypatch, tmp_path):
+    write_journal(
+        tmp_path / "journal.ndjson",
+        [json.dumps([1.0, {"i": 0}]) + "\n", '[2.0, {"i": '],
+    )
+    sink = Sink()
+    delivery = make_queue(monkeypatch, tmp_path, sink)
+    delivery.enqueue({"i": 1})
+    assert delivery.flush(5)
+    assert sorted(item["i"] for item in sink.received) == [0, 1]
+    assert delivery.journal_size() == 0
+
+
+def test_delivered_batch_is_not_journaled_again(monkeypatch, tmp_path):
+    sink = Sink()
+    delivery = make_queue(monkeypatch, tmp_path, sink)
+    write_journal(
+        tmp_path / "journal.ndjson",
+        ['[2.0, {"i": ', "\n", json.dumps([1.0, {"i": 0}]) + "\n"],
+    )
+    for i in range(1, 4):
+        delivery.enqueue({"i": i})
+    assert delivery.flush(5)
+    delivery.enqueue({"i": 4})
+    assert delivery.flush(5)
+    assert sorted(item["i"] for item in sink.received) == [0, 1, 2, 3, 4]
+    assert delivery.journal_size() == 0
+
+
+def test_failed_batch_is_replayed_after_recovery(monkeypatch, tmp_path):
+    sink = Sink()
+    sink.up = False
+    delivery = make_queue(monkeypatch, tmp_path, sink)
+    for i in range(3):
+        delivery.enqueue({"i": i})
+    assert delivery.flush(5)
+    assert delivery.stats()["journal"] == 3
+
+    sink.up = True
+    delivery.enqueue({"i": 3})
+    assert delivery.flush(5)
+    assert sorted(item["i"] for item in sink.received) == [0, 1, 2, 3]
+    stats = delivery.stats()
+    assert (stats["journal"], stats["replayed"], stats["spilled"]) == (0, 3, 3)
+
+
+def test_spill_does_not_wait_for_a_slow_replay(monkeypatch, tmp_path):
+    monkeypatch.setattr(json_poster, "MAX_QUEUE", 1)
+    write_journal(tmp_path / "journal.ndjson", [json.dumps([1.0, {"i": 0}]) + "\n"])
+    sink = Sink()
+    sink.gate.clear()
+    delivery = make_queue(monkeypatch, tmp_path, sink)
+    time.sleep(0.05)  # The worker is now stuck replaying the journal.
+
+    delivery.enqueue({"i": 1})
+    start = time.monotonic()
+    receipt = delivery.enqueue({"i": 2})
+    assert receipt.get("spilled")
+    assert time.monotonic() - start < 0.5
+
+    sink.gate.set()
+    assert delivery.flush(5)
+    delivery.enqueue({"i": 3})
+    assert delivery.flush(5)
+    assert sorted(item["i"] for item in sink.received) == [0, 1, 2, 3]
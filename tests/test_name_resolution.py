@@ -0,0 +1,31 @@
+from name_resolution import NameResolver
+
+
+def resolver():
+    resolver = NameResolver(seed_reference=False)
+    resolver._add("state bank of india", "State Bank of India")
+    resolver._add("sbi", "State Bank of India")
+    resolver._add("reliance industries", "Reliance Industries Limited")
+    return resolver
+
+
+def test_spellings_and_aliases_share_a_key():
+    names = resolver()
+    assert names.canonical_key("State Bank of India Ltd.") == "state bank of india"
+    assert names.canonical_key("SBI") == "state bank of india"
+    assert names.canonical_name("sbi") == "State Bank of India"
+
+
+def test_similar_names_are_not_merged():
+    names = resolver()
+    assert names.resolve("State Bank of Indiana") is None
+    assert names.canonical_key("State Bank of Indiana") == "state bank of indiana"
+    assert names.canonical_key("Reliance Industrial") == "reliance industrial"
+
+
+def test_similar_names_are_only_suggested():
+    names = resolver()
+    suggestion = names.suggest("State Bank of Indiana")
+    assert suggestion["canonical"] == "State Bank of India"
+    assert suggestion["match"] == "suggestion"
+    assert names.suggest("State Bank of India") is None
@@ -0,0 +1,85 @@
+import time
+
+import pytest
+
+import name_resolution
+import rate_limiter
+import services
+import wikidata
+from rate_limiter import RateLimitExceeded, TokenBucket
+
+
+def test_bucket_serves_its_burst_then_rejects():
+    bucket = TokenBucket("test", rate_per_minute=60, capacity=3, max_wait=0)
+    for _ in range(3):
+        bucket.acquire()
+    with pytest.raises(RateLimitExceeded):
+        bucket.acquire()
+    assert (bucket.stats()["acquired"], bucket.stats()["rejected"]) == (3, 1)
+
+
+def test_bucket_waits_for_a_refill():
+    bucket = TokenBucket("test", rate_per_minute=600, capacity=1, max_wait=1)
+    bucket.acquire()
+    start = time.monotonic()
+    bucket.acquire()
+    assert 0.05 <= time.monotonic() - start < 0.5
+
+
+class FakeTicker:
+    def __init__(self, ticker):
+        self.info = {"longName": ticker, "marketCap": 1000}
+
+
+@pytest.fixture
+def small_budget(monkeypatch):
+    bucket = TokenBucket("yfinance", rate_per_minute=60, capacity=5, max_wait=0)
+    monkeypatch.setitem(rate_limiter._limiters, "yfinance", bucket)
+    monkeypatch.setattr(services.yf, "Ticker", FakeTicker)
+    monkeypatch.setattr(services, "get_cached_data", lambda key: None)
+    monkeypatch.setattr(services, "set_cached_data", lambda *args, **kwargs: None)
+    services._info_cache.clear()
+    return bucket
+
+
+def test_bulk_reports_tickers_over_budget_as_retryable(small_budget):
+    tickers = [f"T{i}" for i in range(8)]
+    bulk = services.get_bulk_financials(tickers, sections=["market_data"])
+    assert len(bulk["tickers"]) == 5
+    assert bulk["errors"] == {}
+    assert sorted(bulk["tickers"] + bulk["rate_limited"]) == sorted(tickers)
+    assert bulk["retry_after"] == 3
+
+
+def test_bulk_rejects_non_string_tickers():
+    with pytest.raises(ValueError):
+        services.get_bulk_financials(["AAPL", 42])
+
+
+@pytest.fixture
+def exhausted(monkeypatch):
+    for name in ("yahoo_search", "wikidata"):
+        bucket = TokenBucket(name, rate_per_minute=1, capacity=0, max_wait=0)
+        monkeypatch.setitem(rate_limiter._limiters, name, bucket)
+    # An unseeded resolver keeps name_key from building the reference index.
+    monkeypatch.setattr(
+        name_resolution, "_resolver", name_resolution.NameResolver(seed_reference=False)
+    )
+    monkeypatch.setattr(services, "get_cached_data", lambda key: None)
+    for cache in (wikidata.id_cache, wikidata.query_cache, wikidata.profile_cache):
+        cache.clear()
+
+
+def test_lookups_over_budget_return_nothing_instead_of_raising(exhausted):
+    assert services.get_ticker_from_name("Rate Limited Corp") is None
+    assert wikidata.get_wikidata_id("Rate Limited Corp") is None
+    assert wikidata.fetch_wikidata("SELECT ?item WHERE {}") == []
+    assert wikidata.get_entity_profile("Q1")["details"] == {}
+
+
+def test_lookups_over_budget_are_not_cached(exhausted):
+    wikidata.get_wikidata_id("Rate Limited Corp")
+    wikidata.fetch_wikidata("SELECT ?item WHERE {}")
+    wikidata.get_entity_profiles(["Q1"])
+    for cache in (wikidata.id_cache, wikidata.query_cache, wikidata.profile_cache):
+        assert len(cache) == 0
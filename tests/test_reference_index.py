@@ -0,0 +1,70 @@
+import os
+
+import pandas as pd
+import pytest
+
+import reference_index
+from name_resolution import NameResolver
+from reference_index import CompanyIndex
+
+
+def write_dataset(folder, names, mtime):
+    path = folder / "indian_companies.csv"
+    pd.DataFrame(
+        {"Name": names, "Location": "Pune", "Industry": "Software"}
+    ).to_csv(path, index=False)
+    os.utime(path, ns=(mtime, mtime))
+
+
+@pytest.fixture
+def index(monkeypatch, tmp_path):
+    data = tmp_path / "data"
+    data.mkdir()
+    write_dataset(data, ["Acme Software"], 10**9)
+    resolver = NameResolver(seed_reference=False)
+    monkeypatch.setattr(reference_index, "get_name_resolver", lambda: resolver)
+    monkeypatch.setattr(reference_index, "CHECK_INTERVAL", 0.0)
+    monkeypatch.setattr(reference_index, "_index", CompanyIndex(data, tmp_path / "ix"))
+    return data, resolver
+
+
+def settle():
+    """Let a background reload triggered by the last lookup finish."""
+    with reference_index._reload_lock:
+        pass
+
+
+def test_index_reloads_when_a_dataset_changes(index):
+    data, resolver = index
+    before = reference_index.index_version()
+    assert reference_index.lookup_company("Globex Systems") is None
+    settle()
+
+    write_dataset(data, ["Acme Software", "Globex Systems"], 2 * 10**9)
+    current = reference_index.get_company_index()
+    assert reference_index.lookup_company("Globex Systems") is None
+    settle()
+    assert reference_index.get_company_index() is not current
+    assert reference_index.lookup_company("Globex Systems")["name"] == "Globex Systems"
+    assert reference_index.index_version() != before
+    assert resolver.resolve("Globex Systems")["match"] == "exact"
+
+
+def test_unchanged_index_is_kept(index):
+    current = reference_index.get_company_index()
+    settle()
+    assert reference_index.get_company_index() is current
+
+
+def test_rebuild_keeps_the_loaded_build(index, tmp_path):
+    data, _ = index
+    current = reference_index.get_company_index()
+    settle()
+    write_dataset(data, ["Acme Software", "Globex Systems"], 2 * 10**9)
+    reference_index.get_company_index()
+    settle()
+
+    fresh = reference_index.get_company_index()
+    assert fresh.build != current.build
+    assert (tmp_path / "ix" / "CURRENT").read_text() == fresh.build.name
+    assert current.lookup("Acme Software")["name"] == "Acme Software"
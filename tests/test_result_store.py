@@ -0,0 +1,95 @@
+import asyncio
+import json
+
+import pytest
+
+from app import CompanyCategorizerApp
+from company_domain_categorizer import DomainCategorizer
+
+
+@pytest.fixture
+def categorizer(tmp_path):
+    categories = tmp_path / "categories.json"
+    categories.write_text(json.dumps({"byType": {}}))
+    context = tmp_path / "context"
+    context.mkdir()
+    (context / "context.json").write_text(json.dumps({"categories": {}}))
+    config = {
+        "categories_file": str(categories),
+        "use_ai": False,
+        "context_folder": str(context),
+        "context_mode": "reference",
+        "reference_index": False,
+        "cache_enabled": False,
+        "cache_folder": str(tmp_path / "cache"),
+        "result_store": True,
+    }
+    return DomainCategorizer(config=config)
+
+
+def categorize(categorizer, names, clean_output=False):
+    return asyncio.run(categorizer.categorize_companies(names, clean_output))
+
+
+def test_results_are_stored_under_normalized_names(categorizer):
+    results = categorize(categorizer, ["Acme Software Inc."])
+    stored = categorizer.stored_results(["acme software", "Globex"])
+    assert stored == {"acme software": json.loads(json.dumps(results[0]))}
+
+
+def edit_categories(categorizer, tmp_path):
+    categorizer.categories_version = "edited"
+
+
+def edit_context(categorizer, tmp_path):
+    (tmp_path / "context" / "context.json").write_text("{}")
+
+
+def embed_full_context(categorizer, tmp_path):
+    categorizer.config["context_mode"] = "full"
+
+
+def enable_ai(categorizer, tmp_path):
+    categorizer.config["use_ai"] = True
+    categorizer.model = object()
+
+
+@pytest.mark.parametrize(
+    "change", [edit_categories, edit_context, embed_full_context, enable_ai]
+)
+def test_changed_inputs_invalidate_stored_results(categorizer, tmp_path, change):
+    categorize(categorizer, ["Acme"])
+    assert categorizer.has_stored_results(["Acme"]) == ["Acme"]
+    change(categorizer, tmp_path)
+    assert categorizer.has_stored_results(["Acme"]) == []
+    assert categorizer.has_stored_results(["Acme"], clean_output=True) == []
+
+
+def test_failed_ai_rows_are_not_stored(categorizer, monkeypatch):
+    categorizer.config["use_ai"] = True
+    categorizer.model = object()
+
+    async def fake_ai(names):
+        return {
+            "Good": {"raw_market_data": {"category": "Software"}},
+            "Garbled": {"plaintext": "not json"},
+            "Failed": None,
+        }
+
+    monkeypatch.setattr(categorizer, "categorize_companies_ai", fake_ai)
+    categorize(categorizer, ["Good", "Garbled", "Failed"])
+    assert categorizer.has_stored_results(["Good", "Garbled", "Failed"]) == ["Good"]
+
+
+def test_file_chunks_reuse_stored_rows_once(categorizer):
+    categorize(categorizer, ["Acme", "Globex"])
+    app = CompanyCategorizerApp.__new__(CompanyCategorizerApp)
+    app.categorizer = categorizer
+    app.item_timeout = None
+    hits = categorizer.result_store.hits
+
+    chunks = list(app._company_chunks(["Acme", "Initech", "Globex", "Acme"]))
+    assert chunks == [(["Acme", "Globex"], True), (["Initech"], False)]
+    outputs = [asyncio.run(app._categorize_chunk(False)(chunk)) for chunk in chunks]
+    assert [len(output) for output in outputs] == [2, 1]
+    assert categorizer.result_store.hits - hits == 2
@@ -0,0 +1,38 @@
+import os
+
+import pandas as pd
+
+import snapshot
+
+
+def write_table(path, names):
+    pd.DataFrame(
+        {"Company": names, "Employees": range(len(names)), "Mixed": [1, "x"] * 2}
+    ).to_csv(path, index=False)
+
+
+def test_snapshot_columns_match_the_source(tmp_path):
+    source = tmp_path / "companies.csv"
+    write_table(source, ["Acme", "Globex", None, "Initech"])
+    columns = snapshot.load_columns(source)
+    expected = pd.read_csv(source)
+    assert list(columns["Employees"]) == list(expected["Employees"])
+    assert list(columns["Company"]) == ["Acme", "Globex", None, "Initech"]
+    assert list(columns["Mixed"]) == list(expected["Mixed"])
+    assert list(snapshot.load_columns(source, ["Company"])) == ["Company"]
+
+
+def test_rebuild_switches_current_and_keeps_one_previous_build(tmp_path):
+    source = tmp_path / "companies.csv"
+    root = snapshot._snapshot_dir(source)
+    for round_ in range(3):
+        write_table(source, [f"Company {round_}", "B", "C", "D"])
+        os.utime(source, ns=(round_ * 10**9, round_ * 10**9))
+        assert not snapshot.is_fresh(source)
+        assert snapshot.load_columns(source, ["Company"])["Company"][0] == (
+            f"Company {round_}"
+        )
+        assert snapshot.is_fresh(source)
+    builds = [path for path in root.iterdir() if path.is_dir()]
+    assert len(builds) == 2
+    assert snapshot.current_build(root) in builds
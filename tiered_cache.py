@@ -0,0 +1,235 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+from ttl_cache import TTLCache
+
+try:
+    import msgpack
+except ImportError:  # msgpack is optional; JSON is used without it
+    msgpack = None
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+# Values larger than this are zlib-compressed before leaving the process.
+COMPRESS_THRESHOLD = 1024
+
+
+def encode_value(value: Any) -> bytes:
+    """Serialize with msgpack when available (JSON otherwise), compressing
+    large payloads. The first byte records the format."""
+    if msgpack is not None:
+        fmt, payload = b"m", msgpack.packb(value, use_bin_type=True, default=str)
+    else:
+        fmt, payload = b"j", json.dumps(value, default=str).encode("utf-8")
+    if len(payload) > COMPRESS_THRESHOLD:
+        return fmt.upper() + zlib.compress(payload)
+    return fmt + payload
+
+
+def decode_value(blob: Union[bytes, str]) -> Any:
+    if isinstance(blob, str):
+        # Plain JSON written by older versions of this module.
+        return json.loads(blob)
+    fmt, payload = blob[:1], blob[1:]
+    if fmt.isupper():
+        payload = zlib.decompress(payload)
+    if fmt.lower() == b"m":
+        if msgpack is None:
+            raise ValueError("msgpack value found but msgpack is not installed")
+        return msgpack.unpackb(payload, raw=False)
+    if fmt.lower() == b"j":
+        return json.loads(payload)
+    # Anything else is treated as legacy plain JSON.
+    return json.loads(blob)
+
+
+class CircuitBreaker:
+    """Opens after ``failure_threshold`` consecutive failures and allows a
+    single trial call once ``reset_timeout`` seconds have passed."""
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at >= self.reset_timeout:
+                # Half-open: let one caller probe, keep the rest out.
+                self.opened_at = time.monotonic()
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+    @property
+    def state(self) -> str:
+        return "closed" if self.opened_at is None else "open"
+
+
+class DiskStore:
+    """SQLite file holding encoded values with per-entry expiry."""
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                value BLOB NOT NULL,
+                expires_at REAL NOT NULL
+            )"""
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] < time.time():
+                self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            return row[0]
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, time.time() + ttl),
+            )
+            self._conn.commit()
+
+    def purge_expired(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM entries WHERE expires_at < ?", (time.time(),))
+            self._conn.commit()
+
+
+class TieredCache:
+    """In-process LRU in front of Redis, with a local disk store fallback.
+
+    Reads go LRU -> Redis -> disk and promote hits into the LRU. Redis calls
+    are guarded by a circuit breaker so an unreachable server costs one
+    failed attempt per reset window instead of one per lookup.
+    """
+
+    def __init__(
+        self,
+        redis_client=None,
+        disk_path: Optional[Union[str, Path]] = None,
+        memory_entries: int = 2048,
+        memory_ttl: float = 300.0,
+        breaker: Optional[CircuitBreaker] = None,
+    ):
+        self.memory = TTLCache(max_entries=memory_entries, ttl=memory_ttl)
+        self.memory_ttl = memory_ttl
+        self.redis = redis_client
+        self.breaker = breaker or CircuitBreaker()
+        self.disk: Optional[DiskStore] = None
+        if disk_path:
+            try:
+                self.disk = DiskStore(disk_path)
+            except Exception as e:
+                logger.warning(f"Disk cache unavailable: {e}")
+        self.redis_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _redis_call(self, method: str, *args):
+        if self.redis is None or not self.breaker.allow():
+            return _MISSING
+        try:
+            result = getattr(self.redis, method)(*args)
+            self.breaker.record_success()
+            return result
+        except Exception as e:
+            self.breaker.record_failure()
+            logger.warning(f"Redis {method} failed ({self.breaker.state}): {e}")
+            return _MISSING
+
+    def get(self, key: str, default: Any = None) -> Any:
+        value = self.memory.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        blob = self._redis_call("get", key)
+        if blob not in (_MISSING, None):
+            try:
+                value = decode_value(blob)
+                self.redis_hits += 1
+                self.memory.set(key, value)
+                return value
+            except Exception as e:
+                logger.error(f"Cache decode error for {key}: {e}")
+
+        if self.disk is not None:
+            try:
+                blob = self.disk.get(key)
+                if blob is not None:
+                    value = decode_value(blob)
+                    self.disk_hits += 1
+                    self.memory.set(key, value)
+                    return value
+            except Exception as e:
+                logger.error(f"Disk cache read error for {key}: {e}")
+
+        self.misses += 1
+        return default
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        self.memory.set(key, value, ttl=min(ttl, self.memory_ttl))
+        try:
+            blob = encode_value(value)
+        except Exception as e:
+            logger.error(f"Cache encode error for {key}: {e}")
+            return
+        stored = self._redis_call("setex", key, int(max(1, ttl)), blob)
+        if stored is _MISSING and self.disk is not None:
+            try:
+                self.disk.set(key, blob, ttl)
+            except Exception as e:
+                logger.error(f"Disk cache write error for {key}: {e}")
+
+    def delete(self, key: str) -> None:
+        self.memory.delete(key)
+        self._redis_call("delete", key)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "memory": self.memory.stats(),
+            "redis_hits": self.redis_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "redis": (
+                "disabled" if self.redis is None else self.breaker.state
+            ),
+            "disk": str(self.disk.path) if self.disk else None,
+            "serializer": "msgpack" if msgpack is not None else "json",
+        }
@@ -0,0 +1,178 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Thread-safe in-process LRU cache whose entries expire individually."""
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 3600.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        expires = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self._data),
+            "max_entries": self.max_entries,
+        }
+
+
+class _Call:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class Singleflight:
+    """Coalesces concurrent calls for the same key into one execution.
+
+    Threads that arrive while a call for their key is running wait for it and
+    share its result (or exception).
+    """
+
+    def __init__(self):
+        self.coalesced = 0
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, func: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+
+class AsyncSingleflight:
+    """asyncio counterpart of Singleflight.
+
+    Coroutines awaiting the same key while a call is running share its
+    task. Each waiter is shielded, so one caller timing out or
+    disconnecting does not cancel the computation for the others.
+    """
+
+    def __init__(self):
+        self.coalesced = 0
+        self._tasks: Dict[Tuple[int, Hashable], asyncio.Future] = {}
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        # Tasks belong to one event loop, so flights are tracked per loop.
+        flight_key = (id(asyncio.get_running_loop()), key)
+        task = self._tasks.get(flight_key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._tasks[flight_key] = task
+
+            def forget(done: asyncio.Future) -> None:
+                if self._tasks.get(flight_key) is done:
+                    del self._tasks[flight_key]
+
+            task.add_done_callback(forget)
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+
+def cached(
+    cache: TTLCache,
+    key: Callable[..., Hashable],
+    negative_ttl: Optional[float] = None,
+    is_negative: Callable[[Any], bool] = lambda value: not value,
+):
+    """Memoize a function in ``cache`` with request coalescing.
+
+    Results for which ``is_negative`` is true (None, empty list, ...) are
+    kept for ``negative_ttl`` seconds instead of the cache's default TTL, so
+    failed or empty lookups are retried sooner.
+    """
+
+    def decorator(func):
+        flight = Singleflight()
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            cache_key = key(*args, **kwargs)
+            value = cache.get(cache_key, _MISSING)
+            if value is not _MISSING:
+                return value
+
+            def load():
+                value = func(*args, **kwargs)
+                ttl = negative_ttl if is_negative(value) else None
+                cache.set(cache_key, value, ttl=ttl)
+                return value
+
+            return flight.do(cache_key, load)
+
+        wrapper.cache = cache
+        wrapper.singleflight = flight
+        return wrapper
+
+    return decorator
@@ -1,16 +1,55 @@
 import requests
 import logging
+import os
+from typing import Dict, List
+
+from http_client import get_http_client
+from name_resolution import canonical_name, learn_name, name_key
+from rate_limiter import RateLimitExceeded, get_limiter
+from ttl_cache import TTLCache, Singleflight, cached
 
 logger = logging.getLogger(__name__)
 
+# Entities resolved per combined SPARQL request.
+PROFILE_BATCH_SIZE = int(os.getenv("WIKIDATA_BATCH_SIZE", "50"))
+
+# Empty or failed lookups are cached for NEGATIVE_TTL so they are retried
+# sooner than real results. Lookups rejected by the local rate limiter are
+# not cached at all.
+CACHE_TTL = float(os.getenv("WIKIDATA_CACHE_TTL", "86400"))
+NEGATIVE_TTL = float(os.getenv("WIKIDATA_NEGATIVE_TTL", "300"))
+CACHE_SIZE = int(os.getenv("WIKIDATA_CACHE_SIZE", "4096"))
+
+id_cache = TTLCache(max_entries=CACHE_SIZE, ttl=CACHE_TTL)
+query_cache = TTLCache(max_entries=CACHE_SIZE, ttl=CACHE_TTL)
+profile_cache = TTLCache(max_entries=CACHE_SIZE, ttl=CACHE_TTL)
+_profile_flight = Singleflight()
+
 
 def get_wikidata_id(company_name):
-    url = f"https://www.wikidata.org/w/api.php?action=wbsearchentities&search={company_name}&language=en&format=json"
     try:
-        response = requests.get(url, timeout=5)
+        return _search_wikidata_id(company_name)
+    except RateLimitExceeded as e:
+        logger.error(f"Error fetching wikidata ID for {company_name}: {e}")
+        return None
+
+
+@cached(
+    id_cache,
+    key=name_key,
+    negative_ttl=NEGATIVE_TTL,
+)
+def _search_wikidata_id(company_name):
+    # RateLimitExceeded propagates, so rejections bypass the cache.
+    query = canonical_name(company_name)
+    url = f"https://www.wikidata.org/w/api.php?action=wbsearchentities&search={query}&language=en&format=json"
+    get_limiter("wikidata").acquire()
+    try:
+        response = get_http_client().get(url, timeout=5)
         response.raise_for_status()
         data = response.json()
         if "search" in data and data["search"]:
+            learn_name(query)
             return data["search"][0]["id"]
         return None
     except requests.exceptions.RequestException as e:
@@ -19,10 +58,21 @@ def get_wikidata_id(company_name):
 
 
 def fetch_wikidata(query):
+    try:
+        return _run_sparql(query)
+    except RateLimitExceeded as e:
+        logger.error(f"SPARQL query failed: {e}")
+        return []
+
+
+@cached(query_cache, key=lambda query: query, negative_ttl=NEGATIVE_TTL)
+def _run_sparql(query):
+    # RateLimitExceeded propagates, so rejections bypass the cache.
     endpoint = "https://query.wikidata.org/sparql"
     params = {"query": query, "format": "json"}
+    get_limiter("wikidata").acquire()
     try:
-        response = requests.get(endpoint, params=params, timeout=5)
+        response = get_http_client().get(endpoint, params=params, timeout=5)
         response.raise_for_status()
         data = response.json()
         return data["results"]["bindings"] if "results" in data else []
@@ -31,62 +81,154 @@ def fetch_wikidata(query):
         return []
 
 
-def get_wikidata_details(wikidata_id):
-    query = f"""
-    SELECT ?industryLabel ?countryLabel ?hqLabel ?founded ?employees WHERE {{
-        OPTIONAL {{ wd:{wikidata_id} wdt:P452 ?industry. }}
-        OPTIONAL {{ wd:{wikidata_id} wdt:P17 ?country. }}
-        OPTIONAL {{ wd:{wikidata_id} wdt:P159 ?hq. }}
-        OPTIONAL {{ wd:{wikidata_id} wdt:P571 ?founded. }}
-        OPTIONAL {{ wd:{wikidata_id} wdt:P1128 ?employees. }}
+def _entity_id(uri):
+    return uri.rsplit("/", 1)[-1]
+
+
+def _profile_query(wikidata_ids):
+    """One query returning details, funding and direct competitors for every
+    entity in ``wikidata_ids``, tagged per row by ``?kind``."""
+    values = " ".join(f"wd:{wikidata_id}" for wikidata_id in wikidata_ids)
+    return f"""
+    SELECT ?item ?kind ?industry ?industryLabel ?countryLabel ?hqLabel ?founded
+           ?employees ?investmentLabel ?amount ?currencyLabel ?competitorLabel
+    WHERE {{
+        {{
+            VALUES ?item {{ {values} }}
+            BIND("details" AS ?kind)
+            OPTIONAL {{ ?item wdt:P452 ?industry. }}
+            OPTIONAL {{ ?item wdt:P17 ?country. }}
+            OPTIONAL {{ ?item wdt:P159 ?hq. }}
+            OPTIONAL {{ ?item wdt:P571 ?founded. }}
+            OPTIONAL {{ ?item wdt:P1128 ?employees. }}
+        }} UNION {{
+            VALUES ?item {{ {values} }}
+            BIND("funding" AS ?kind)
+            ?investment wdt:P3320 ?item.
+            OPTIONAL {{ ?investment wdt:P4999 ?amount. }}
+            OPTIONAL {{ ?investment wdt:P38 ?currency. }}
+        }} UNION {{
+            VALUES ?item {{ {values} }}
+            BIND("competitor" AS ?kind)
+            ?item wdt:P4886 ?competitor.
+        }}
         SERVICE wikibase:label {{ bd:serviceParam wikibase:language "en". }}
-    }} LIMIT 1
+    }}
     """
-    results = fetch_wikidata(query)
-    if not results:
-        return {}
-    result = results[0]
+
+
+def _empty_profile():
     return {
-        "Industry": result.get("industryLabel", {}).get("value", "N/A"),
-        "Country": result.get("countryLabel", {}).get("value", "N/A"),
-        "Headquarters": result.get("hqLabel", {}).get("value", "N/A"),
-        "Founded": result.get("founded", {}).get("value", "N/A"),
-        "Employees": result.get("employees", {}).get("value", "N/A"),
+        "details": {},
+        "funding_rounds": [],
+        "industry_id": None,
+        "direct_competitors": [],
     }
 
 
-def get_funding_rounds(wikidata_id):
-    query = f"""
-    SELECT ?investmentLabel ?amount ?currencyLabel WHERE {{
-      ?investment wdt:P3320 wd:{wikidata_id}.
-      OPTIONAL {{ ?investment wdt:P4999 ?amount. }}
-      OPTIONAL {{ ?investment wdt:P38 ?currency. }}
-      SERVICE wikibase:label {{ bd:serviceParam wikibase:language "en". }}
-    }}
+def _is_empty_profile(profile):
+    return not (
+        profile["details"] or profile["funding_rounds"] or profile["direct_competitors"]
+    )
+
+
+def get_entity_profiles(wikidata_ids) -> Dict[str, Dict]:
+    """Fetch details, funding rounds, industry and direct competitors for many
+    entities, PROFILE_BATCH_SIZE entities per SPARQL request.
+
+    Profiles are cached per entity, so only uncached ids are queried.
     """
-    results = fetch_wikidata(query)
-    funding_data = []
-    for result in results:
-        amount = result.get("amount", {}).get("value", "Unknown")
-        currency = result.get("currencyLabel", {}).get("value", "Unknown")
-        funding_data.append(
-            {
-                "round": result.get("investmentLabel", {}).get("value", "Unknown"),
-                "amount": amount,
-                "currency": currency,
-            }
-        )
-    return funding_data if funding_data else []
+    wikidata_ids = list(dict.fromkeys(i for i in wikidata_ids if i))
+    profiles = {}
+    for wikidata_id in wikidata_ids:
+        profile = profile_cache.get(wikidata_id)
+        if profile is not None:
+            profiles[wikidata_id] = profile
+    missing = [i for i in wikidata_ids if i not in profiles]
+    try:
+        fetched = _fetch_entity_profiles(missing)
+    except RateLimitExceeded as e:
+        # Served empty but not cached, so the next call queries again.
+        logger.error(f"SPARQL query failed: {e}")
+        fetched = {wikidata_id: _empty_profile() for wikidata_id in missing}
+    else:
+        for wikidata_id, profile in fetched.items():
+            ttl = NEGATIVE_TTL if _is_empty_profile(profile) else None
+            profile_cache.set(wikidata_id, profile, ttl=ttl)
+    profiles.update(fetched)
+    return {wikidata_id: profiles[wikidata_id] for wikidata_id in wikidata_ids}
+
+
+def _fetch_entity_profiles(wikidata_ids) -> Dict[str, Dict]:
+    profiles = {wikidata_id: _empty_profile() for wikidata_id in wikidata_ids}
+    for offset in range(0, len(wikidata_ids), PROFILE_BATCH_SIZE):
+        chunk = wikidata_ids[offset : offset + PROFILE_BATCH_SIZE]
+        # Profiles are cached per entity above, so skip the per-query cache.
+        for result in _run_sparql.__wrapped__(_profile_query(chunk)):
+            profile = profiles.get(_entity_id(result["item"]["value"]))
+            if profile is None:
+                continue
+            kind = result.get("kind", {}).get("value")
+            if kind == "details" and not profile["details"]:
+                # Mirrors the former LIMIT 1: the first row wins.
+                profile["details"] = {
+                    "Industry": result.get("industryLabel", {}).get("value", "N/A"),
+                    "Country": result.get("countryLabel", {}).get("value", "N/A"),
+                    "Headquarters": result.get("hqLabel", {}).get("value", "N/A"),
+                    "Founded": result.get("founded", {}).get("value", "N/A"),
+                    "Employees": result.get("employees", {}).get("value", "N/A"),
+                }
+                if "industry" in result:
+                    profile["industry_id"] = _entity_id(result["industry"]["value"])
+            elif kind == "funding":
+                profile["funding_rounds"].append(
+                    {
+                        "round": result.get("investmentLabel", {}).get(
+                            "value", "Unknown"
+                        ),
+                        "amount": result.get("amount", {}).get("value", "Unknown"),
+                        "currency": result.get("currencyLabel", {}).get(
+                            "value", "Unknown"
+                        ),
+                    }
+                )
+            elif kind == "competitor" and "competitorLabel" in result:
+                profile["direct_competitors"].append(
+                    result["competitorLabel"]["value"]
+                )
+    return profiles
+
+
+def get_entity_profile(wikidata_id) -> Dict:
+    """Profile for one entity; concurrent callers for the same id share a query."""
+    return _profile_flight.do(
+        wikidata_id,
+        lambda: get_entity_profiles([wikidata_id]).get(wikidata_id, _empty_profile()),
+    )
+
+
+def cache_stats() -> Dict[str, Dict]:
+    return {
+        "ids": dict(
+            id_cache.stats(), coalesced=_search_wikidata_id.singleflight.coalesced
+        ),
+        "queries": dict(
+            query_cache.stats(), coalesced=_run_sparql.singleflight.coalesced
+        ),
+        "profiles": dict(profile_cache.stats(), coalesced=_profile_flight.coalesced),
+    }
+
+
+def get_wikidata_details(wikidata_id):
+    return get_entity_profile(wikidata_id)["details"]
+
+
+def get_funding_rounds(wikidata_id) -> List[Dict]:
+    return get_entity_profile(wikidata_id)["funding_rounds"]
 
 
 def get_industry_id(wikidata_id):
-    query = f"""
-    SELECT ?industry WHERE {{
-        wd:{wikidata_id} wdt:P452 ?industry.
-    }}
-    """
-    results = fetch_wikidata(query)
-    return results[0]["industry"]["value"].split("/")[-1] if results else None
+    return get_entity_profile(wikidata_id)["industry_id"]
 
 
 def search_industry_id(industry_name):
@@ -122,11 +264,4 @@ def get_industry_competitors(company_id=None, industry_id=None, industry_name=No
 
 
 def get_direct_competitors(wikidata_id):
-    query = f"""
-    SELECT ?competitorLabel WHERE {{
-        wd:{wikidata_id} wdt:P4886 ?competitor.
-        SERVICE wikibase:label {{ bd:serviceParam wikibase:language "en". }}
-    }}
-    """
-    results = fetch_wikidata(query)
-    return [result["competitorLabel"]["value"] for result in results]
+    return get_entity_profile(wikidata_id)["direct_competitors"]